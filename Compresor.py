@@ -5,7 +5,8 @@ import threading
 from compression.text_compression import TextCompressor
 from compression.image_compression import ImageCompressor
 from compression.audio_compression import AudioCompressor
-from PIL import Image, ImageTk
+from compression.thumbnails import ThumbnailService
+from PIL import ImageTk
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
@@ -26,6 +27,8 @@ class CompressionApp:
         self.text_compressor = TextCompressor(os.path.join(self.main_output_dir, "texto"))
         self.image_compressor = ImageCompressor(os.path.join(self.main_output_dir, "imagenes"))
         self.audio_compressor = AudioCompressor(os.path.join(self.main_output_dir, "audio"))
+        # Compartido entre ventanas para que la caché en memoria sobreviva al cerrarlas
+        self.thumbnail_service = ThumbnailService(os.path.join(self.main_output_dir, "miniaturas"))
         
         self.setup_ui()
     
@@ -141,7 +144,7 @@ class CompressionApp:
         window.window.grab_set()
     
     def open_image_compression(self):
-        window = ImageCompressionWindow(self.root, self.image_compressor)
+        window = ImageCompressionWindow(self.root, self.image_compressor, self.thumbnail_service)
         window.window.transient(self.root)
         window.window.grab_set()
     
@@ -623,8 +626,10 @@ class TextCompressionWindow(CompressionWindow):
             messagebox.showerror("Error", f"❌ Error al descomprimir: {str(e)}")
 
 class ImageCompressionWindow(CompressionWindow):
-    def __init__(self, parent, compressor):
+    def __init__(self, parent, compressor, thumbnail_service):
         super().__init__(parent, compressor, "Compresión de Imágenes", "🖼️", ("#FF5722", "#D84315"))
+        self.thumbnail_service = thumbnail_service
+        self.thumbnail_path = None
         self.is_compressed_file = False
         self.original_image = None
         self.compressed_image = None
@@ -705,7 +710,7 @@ class ImageCompressionWindow(CompressionWindow):
             title="Seleccionar archivo de imagen",
             filetypes=[
                 ("Archivos de imagen", "*.png *.jpg *.jpeg *.bmp"),
-                ("Archivos comprimidos", "*.imgcomp"),
+                ("Archivos comprimidos", "*.rle *.rles"),
                 ("Todos los archivos", "*.*")
             ]
         )
@@ -714,7 +719,7 @@ class ImageCompressionWindow(CompressionWindow):
             file_size = self.get_file_size(file_path)
             
             # Verificar si es un archivo comprimido
-            self.is_compressed_file = file_path.endswith('.imgcomp')
+            self.is_compressed_file = file_path.endswith(('.rle', '.rles'))
             
             if self.is_compressed_file:
                 self.file_label.configure(
@@ -723,7 +728,10 @@ class ImageCompressionWindow(CompressionWindow):
                 )
                 self.compress_btn.configure(state="disabled")
                 self.decompress_btn.configure(state="normal")
+                # Descartar la miniatura que aún se esté generando para la imagen anterior
+                self.thumbnail_path = None
                 self.original_image_label.configure(text="No hay imagen cargada", image=None)
+                self.show_compressed_preview(file_path)
             else:
                 self.file_label.configure(
                     text=f"🖼️ Archivo: {os.path.basename(file_path)}\n"
@@ -732,16 +740,9 @@ class ImageCompressionWindow(CompressionWindow):
                 self.compress_btn.configure(state="normal")
                 self.decompress_btn.configure(state="disabled")
                 
-                # Mostrar imagen original
-                try:
-                    self.original_image = Image.open(file_path)
-                    # Redimensionar imagen para la vista previa
-                    self.original_image.thumbnail((250, 180))
-                    self.original_photo = ImageTk.PhotoImage(self.original_image)
-                    self.original_image_label.configure(image=self.original_photo, text="")
-                except Exception as e:
-                    messagebox.showerror("Error", f"❌ Error al cargar la imagen: {str(e)}")
-                    self.original_image_label.configure(text="No hay imagen cargada", image=None)
+                # Mostrar imagen original (la miniatura se genera fuera del hilo de Tk)
+                self.original_image_label.configure(text="Cargando vista previa...", image=None)
+                self.request_original_thumbnail(file_path, show_errors=True)
     
     def compress_file(self):
         if not self.file_path or self.is_compressed_file:
@@ -761,14 +762,7 @@ class ImageCompressionWindow(CompressionWindow):
                      f"📈 Ratio de compresión: {compression_ratio:.1f}%"
             )
             # Mostrar imagen comprimida
-            try:
-                self.compressed_image = Image.open(compressed_file)
-                self.compressed_image.thumbnail((250, 180))
-                self.compressed_photo = ImageTk.PhotoImage(self.compressed_image)
-                self.compressed_image_label.configure(image=self.compressed_photo, text="")
-            except Exception as e:
-                print(f"Error al mostrar imagen comprimida: {str(e)}")
-                self.compressed_image_label.configure(text="No hay imagen comprimida", image=None)
+            self.show_compressed_preview(compressed_file)
             self.update_progress(1.0)
             self.decompress_btn.configure(state="normal")
             messagebox.showinfo("Éxito", "✅ Imagen comprimida correctamente")
@@ -776,6 +770,45 @@ class ImageCompressionWindow(CompressionWindow):
             self.update_progress(0)
             messagebox.showerror("Error", f"❌ Error al comprimir: {str(e)}")
     
+    def request_original_thumbnail(self, file_path, show_errors=False):
+        self.thumbnail_path = file_path
+        
+        def done(thumbnail, error):
+            # El servicio llama desde su hilo: los widgets solo se tocan en el de Tk
+            self.window.after(0, self.show_original_thumbnail, file_path, thumbnail, error, show_errors)
+        
+        self.thumbnail_service.request(file_path, done)
+    
+    def show_original_thumbnail(self, file_path, thumbnail, error, show_errors):
+        # Ignorar miniaturas de archivos que ya no son los últimos pedidos
+        if not self.window.winfo_exists() or file_path != self.thumbnail_path:
+            return
+        if error is not None:
+            if show_errors:
+                messagebox.showerror("Error", f"❌ Error al cargar la imagen: {str(error)}")
+            else:
+                print(f"Error al mostrar imagen: {str(error)}")
+            self.original_image_label.configure(text="No hay imagen cargada", image=None)
+            return
+        self.original_image = thumbnail
+        self.original_photo = ImageTk.PhotoImage(thumbnail)
+        self.original_image_label.configure(image=self.original_photo, text="")
+    
+    def show_compressed_preview(self, compressed_file):
+        """Mostrar la vista previa guardada en la cabecera del archivo comprimido, sin descomprimirlo"""
+        try:
+            self.compressed_image = self.compressor.read_preview(compressed_file)
+            if self.compressed_image is None:
+                raise Exception("el archivo no tiene vista previa")
+            # La vista previa es pequeña: se amplía hasta el tamaño de la etiqueta si hace falta
+            scale = min(250 / self.compressed_image.width, 180 / self.compressed_image.height)
+            size = (max(int(self.compressed_image.width * scale), 1), max(int(self.compressed_image.height * scale), 1))
+            self.compressed_photo = ImageTk.PhotoImage(self.compressed_image.resize(size))
+            self.compressed_image_label.configure(image=self.compressed_photo, text="")
+        except Exception as e:
+            print(f"Error al mostrar imagen comprimida: {str(e)}")
+            self.compressed_image_label.configure(text="No hay imagen comprimida", image=None)
+    
     def decompress_file(self):
         if not self.file_path:
             return
@@ -783,10 +816,11 @@ class ImageCompressionWindow(CompressionWindow):
             self.update_progress(0.2)
             import time
             time.sleep(0.5)
-            if self.is_compressed_file:
-                decompressed_file = self.compressor.decompress(self.file_path)
+            compressed_file = self.file_path if self.is_compressed_file else self.compressed_path
+            if compressed_file.endswith('.rles'):
+                decompressed_file = self.compressor.decompress_sequence(compressed_file)
             else:
-                decompressed_file = self.compressor.decompress(self.compressed_path)
+                decompressed_file = self.compressor.decompress(compressed_file)
             self.update_progress(0.7)
             time.sleep(0.3)
             if self.is_compressed_file:
@@ -802,14 +836,7 @@ class ImageCompressionWindow(CompressionWindow):
                                f"🖼️ Tamaño descomprimido: {self.format_size(decompressed_size)}\n"
                                f"📁 Archivo: {decompressed_filename}")
             # Mostrar imagen descomprimida
-            try:
-                self.original_image = Image.open(decompressed_file)
-                self.original_image.thumbnail((250, 180))
-                self.original_photo = ImageTk.PhotoImage(self.original_image)
-                self.original_image_label.configure(image=self.original_photo, text="")
-            except Exception as e:
-                print(f"Error al mostrar imagen descomprimida: {str(e)}")
-                self.original_image_label.configure(text="No hay imagen cargada", image=None)
+            self.request_original_thumbnail(decompressed_file)
         except Exception as e:
             self.update_progress(0)
             messagebox.showerror("Error", f"❌ Error al descomprimir: {str(e)}")
@@ -0,0 +1,73 @@
+"""Comparar la velocidad de decodificación: Huffman bit a bit, Huffman por tabla y rANS
+
+Uso: python benchmarks/bench_text_decode.py [archivo.txt] [tamaño_MB]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compression.text_compression import TextCompressor
+
+def sample_text(size):
+    words = ["compresión", "datos", "huffman", "tabla", "bits", "archivo",
+             "texto", "símbolo", "código", "la", "el", "de", "que", "y", "en"]
+    random.seed(0)
+    parts = []
+    length = 0
+    while length < size:
+        word = random.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    return ' '.join(parts)[:size]
+
+def legacy_decode(encoded_text, codes):
+    """Bucle original: un bit por iteración y concatenación de cadenas"""
+    reverse_codes = {v: k for k, v in codes.items()}
+    current_code = ""
+    decoded_text = ""
+    
+    for bit in encoded_text:
+        current_code += bit
+        if current_code in reverse_codes:
+            decoded_text += reverse_codes[current_code]
+            current_code = ""
+    
+    return decoded_text
+
+def measure(label, func, size_bytes):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed:8.3f} s  {size_bytes / elapsed / 1e6:8.2f} MB/s")
+    return result
+
+def main():
+    if len(sys.argv) > 1 and os.path.exists(sys.argv[1]):
+        with open(sys.argv[1], 'r', encoding='utf-8') as file:
+            text = file.read()
+    else:
+        size_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 2
+        text = sample_text(int(size_mb * 1024 * 1024))
+    
+    compressor = TextCompressor(tempfile.mkdtemp())
+    encoded_bytes, padding, code_lengths = compressor.compress_text(text)
+    codes = compressor.canonical_codes(compressor.unpack_code_lengths(code_lengths))
+    size_bytes = len(text.encode('utf-8'))
+    print(f"Texto: {size_bytes / 1e6:.2f} MB, comprimido: {len(encoded_bytes) / 1e6:.2f} MB")
+    
+    encoded_text = compressor.unpack_bits(encoded_bytes, padding)
+    legacy = measure("bit a bit", lambda: legacy_decode(encoded_text, codes), size_bytes)
+    table = measure("tabla", lambda: compressor.decompress_text(encoded_bytes, padding, code_lengths), size_bytes)
+    
+    rans_bytes, model = compressor.rans_coder.encode(text)
+    print(f"rANS comprimido: {len(rans_bytes) / 1e6:.2f} MB")
+    rans = measure("rANS", lambda: compressor.rans_coder.decode(rans_bytes, model, len(text)), size_bytes)
+    
+    assert legacy == table == rans == text, "Las decodificaciones no coinciden"
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 import pickle
+from itertools import chain
 import numpy as np
 from scipy.io import wavfile
 import pygame
@@ -27,18 +28,16 @@ class AudioCompressor:
         self.temp_files = []
     
     def differential_encoding(self, data):
-        encoded = [data[0]]
-        for i in range(1, len(data)):
-            encoded.append(data[i] - data[i-1])
-        return encoded
+        # int32: la diferencia de dos muestras int16 puede salirse de int16
+        data = np.asarray(data, dtype=np.int32)
+        return np.concatenate((data[:1], np.diff(data)))
     
     def differential_decoding(self, encoded_data):
-        decoded = [encoded_data[0]]
-        for i in range(1, len(encoded_data)):
-            decoded.append(encoded_data[i] + decoded[i-1])
-        return decoded
+        # Acumular en int64: los runs promediados pueden derivar fuera del rango de int16
+        return np.cumsum(np.asarray(encoded_data, dtype=np.int64))
     
-    def rle_compress_audio(self, data, threshold=10):
+    def rle_compress_audio(self, data, threshold=10, max_run=None):
+        """RLE con media móvil; max_run=None no limita la longitud de los runs"""
         if len(data) == 0:
             return []
         
@@ -47,7 +46,7 @@ class AudioCompressor:
         current = data[0]
         
         for i in range(1, len(data)):
-            if abs(data[i] - current) <= threshold and count < 255:
+            if abs(data[i] - current) <= threshold and (max_run is None or count < max_run):
                 count += 1
                 current = (current * (count - 1) + data[i]) / count
             else:
@@ -59,10 +58,10 @@ class AudioCompressor:
         return compressed
     
     def rle_decompress_audio(self, compressed_data):
-        decompressed = []
-        for value, count in compressed_data:
-            decompressed.extend([value] * count)
-        return decompressed
+        # fromiter evita crear un array de objetos intermedio para la lista de tuplas
+        runs = np.fromiter(chain.from_iterable(compressed_data), dtype=np.int64, count=2 * len(compressed_data))
+        runs = runs.reshape(-1, 2)
+        return np.repeat(runs[:, 0], runs[:, 1])
     
     def convert_to_wav(self, input_file):
         file_ext = os.path.splitext(input_file)[1].lower()
@@ -111,8 +110,9 @@ class AudioCompressor:
                 audio_data = np.mean(audio_data, axis=1)
             
             audio_data = audio_data.astype(np.int16)
-            diff_encoded = self.differential_encoding(audio_data.tolist())
-            compressed_data = self.rle_compress_audio(diff_encoded)
+            diff_encoded = self.differential_encoding(audio_data)
+            # El RLE con media móvil depende de cada muestra anterior; recorre una lista de ints
+            compressed_data = self.rle_compress_audio(diff_encoded.tolist())
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = os.path.splitext(os.path.basename(input_file))[0]
@@ -120,6 +120,8 @@ class AudioCompressor:
             
             compressed_info = {
                 'compressed_data': compressed_data,
+                # Runs sin límite de longitud; los archivos sin esta clave los cortaban en 255
+                'max_run': None,
                 'sample_rate': sample_rate,
                 'original_length': len(audio_data),
                 'data_type': 'wav',
@@ -159,7 +161,7 @@ class AudioCompressor:
             
             diff_decoded = self.rle_decompress_audio(compressed_data)
             audio_data = self.differential_decoding(diff_decoded)
-            audio_array = np.array(audio_data, dtype=np.int16)
+            audio_array = np.clip(audio_data, -32768, 32767).astype(np.int16)
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = os.path.splitext(os.path.basename(input_file))[0]
@@ -0,0 +1,97 @@
+import numpy as np
+
+# Bytes que entran en el hash de ventana de cada posición
+CDC_WINDOW = 48
+CDC_MIN_SIZE = 64 * 1024
+# Una frontera cada 2^18 bytes de media
+CDC_MASK_BITS = 18
+CDC_MAX_SIZE = 1024 * 1024
+READ_SIZE = 8 * 1024 * 1024
+
+class ContentDefinedChunker:
+    """Dividir un archivo en bloques cuyas fronteras dependen solo del contenido cercano
+    
+    El hash de cada posición es la suma de valores aleatorios fijos (uno por byte) de
+    los últimos CDC_WINDOW bytes, calculada con sumas acumuladas de NumPy. Una edición
+    solo mueve las fronteras de su alrededor, así que el resto de bloques se repite.
+    """
+    
+    def __init__(self, min_size=CDC_MIN_SIZE, mask_bits=CDC_MASK_BITS, max_size=CDC_MAX_SIZE):
+        self.min_size = min_size
+        self.mask = np.uint64((1 << mask_bits) - 1)
+        self.max_size = max_size
+        self.gear = np.random.RandomState(0x5EED).randint(0, 1 << 32, 256, dtype=np.uint64)
+    
+    def candidates(self, history, chunk):
+        """Posiciones (relativas a chunk) tras las que el hash de ventana tiene los bits bajos a cero"""
+        values = np.frombuffer(history + chunk, dtype=np.uint8)
+        sums = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(self.gear[values], dtype=np.uint64)])
+        window = sums[CDC_WINDOW:] - sums[:-CDC_WINDOW]
+        ends = np.arange(CDC_WINDOW - 1, len(values))
+        return (ends[(window & self.mask) == 0] - len(history) + 1).tolist()
+    
+    def forced_cut(self, buffer, start, text):
+        cut = start + self.max_size
+        if text:
+            # Retroceder hasta el inicio de un carácter UTF-8
+            while cut > start + 1 and 0x80 <= buffer[cut] < 0xC0:
+                cut -= 1
+            # No separar un \r\n: cada bloque normaliza sus saltos de línea por separado
+            if cut > start + 1 and buffer[cut - 1] == 0x0D and buffer[cut] == 0x0A:
+                cut -= 1
+        return cut
+    
+    def iter_chunks(self, file, text=False):
+        """Leer file (abierto en binario) y devolver sus bloques como bytes
+        
+        En modo texto cada corte se lleva al siguiente salto de línea, así los bloques
+        terminan en líneas completas y nunca parten un carácter UTF-8.
+        """
+        buffer = bytearray()
+        history = b""
+        start = 0
+        pending_hit = None
+        
+        while True:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                break
+            base = len(buffer)
+            buffer += chunk
+            
+            hits = [hit + base for hit in self.candidates(history, chunk)]
+            if pending_hit is not None:
+                hits.insert(0, pending_hit)
+                pending_hit = None
+            
+            for hit in hits:
+                cut = hit
+                if text:
+                    newline = buffer.find(b"\n", max(hit - 1, 0))
+                    if newline < 0:
+                        # El salto de línea llegará en la próxima lectura
+                        pending_hit = hit
+                        break
+                    cut = newline + 1
+                if cut <= start:
+                    continue
+                while cut - start > self.max_size:
+                    forced = self.forced_cut(buffer, start, text)
+                    yield bytes(buffer[start:forced])
+                    start = forced
+                if cut - start >= self.min_size:
+                    yield bytes(buffer[start:cut])
+                    start = cut
+            while len(buffer) - start > self.max_size:
+                forced = self.forced_cut(buffer, start, text)
+                yield bytes(buffer[start:forced])
+                start = forced
+            
+            del buffer[:start]
+            if pending_hit is not None:
+                pending_hit = max(pending_hit - start, 0)
+            start = 0
+            history = (history + chunk)[-(CDC_WINDOW - 1):]
+        
+        if buffer:
+            yield bytes(buffer)
\ No newline at end of file
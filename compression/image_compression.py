@@ -1,103 +1,609 @@
 import os
-import pickle
-from PIL import Image
+import struct
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from PIL import Image, ImageSequence
 import numpy as np
 from datetime import datetime
+from compression.image_filters import RowFilter, FILTER_UP, FILTER_PAETH
+from compression.quadtree import Quadtree
+
+MAGIC = b'RLEI'
+FORMAT_VERSION = 7
+# Cabecera: magia, versión, modo (8 bytes), número de dimensiones, alto, ancho, canales,
+# alto y ancho de tesela, filtros por fila (0/1), codificación de las cuentas, paletas por
+# tesela (0/1), quadtree (0/1). Tras las teselas va la tabla de offsets y su posición ('<Q')
+HEADER_FORMAT = '<4sB8sBIIBIIBBBB'
+# Cuentas de un byte (runs de 255 como máximo) o varint LEB128 (runs sin límite)
+RUN_CODING_BYTE = 0
+RUN_CODING_VARINT = 1
+MAX_VARINT_BYTES = 10
+# Píxeles de la muestra con la que find_palette descarta las teselas con muchos colores
+PALETTE_SAMPLE = 4096
+# Tras la cabecera va la vista previa: ancho, alto, si está codificada (0 = píxeles tal cual)
+# y tamaño en bytes. Se codifica sin filtros para que decodificarla cueste lo mínimo y se
+# guarda tal cual cuando el RLE no la reduce (fotos)
+PREVIEW_FORMAT = '<HHBQ'
+PREVIEW_SIZE = 128
+PREVIEW_OPTIONS = {'filtered': False, 'filter_count': FILTER_UP + 1, 'run_coding': RUN_CODING_VARINT, 'palette': True,
+                   'quadtree': False}
+# Filas por franja en la compresión en streaming
+DEFAULT_STRIP_ROWS = 256
+# Secuencias: cabecera de imagen con SEQUENCE_MAGIC seguida de intervalo entre keyframes y
+# tipo de residuo; cada frame es una tesela completa y el índice guarda un offset por frame
+SEQUENCE_MAGIC = b'RLES'
+SEQUENCE_FORMAT = '<IB'
+DEFAULT_KEYFRAME_INTERVAL = 30
+RESIDUAL_XOR = 0
+RESIDUAL_DIFF = 1
 
 class ImageCompressor:
     def __init__(self, output_dir):
         self.output_dir = output_dir
+        self.row_filter = RowFilter()
+        self.quadtree = Quadtree()
         os.makedirs(output_dir, exist_ok=True)
     
     def rle_compress(self, data):
+        values, counts = self.rle_compress_vectorized(np.asarray(data))
+        return list(zip(values.tolist(), counts.tolist()))
+    
+    def rle_compress_vectorized(self, data, max_run=255):
+        """RLE con NumPy: devuelve los arrays paralelos (valores, longitudes)
+        
+        Con max_run=255 las longitudes son uint8 y los runs largos se parten; con
+        max_run=None cada run es una sola entrada con longitud int64.
+        """
+        data = np.asarray(data).ravel()
         if len(data) == 0:
-            return []
+            return data[:0], np.zeros(0, dtype=np.uint8 if max_run else np.int64)
         
-        compressed = []
-        count = 1
-        current = data[0]
+        # Inicio de cada run: posición 0 y cada cambio de valor
+        starts = np.concatenate(([0], np.flatnonzero(data[1:] != data[:-1]) + 1))
+        lengths = np.diff(np.append(starts, len(data)))
+        if max_run is None:
+            return data[starts], lengths
         
-        for i in range(1, len(data)):
-            if data[i] == current and count < 255:
-                count += 1
-            else:
-                compressed.append((current, count))
-                current = data[i]
-                count = 1
+        # Los runs largos se parten en trozos de 255, con el resto en el último trozo
+        pieces = (lengths + 254) // 255
+        values = np.repeat(data[starts], pieces)
+        counts = np.full(len(values), 255, dtype=np.int64)
+        counts[np.cumsum(pieces) - 1] = lengths - 255 * (pieces - 1)
         
-        compressed.append((current, count))
-        return compressed
+        return values, counts.astype(np.uint8)
     
     def rle_decompress(self, compressed_data):
-        decompressed = []
-        for value, count in compressed_data:
-            decompressed.extend([value] * count)
-        return decompressed
+        values, counts = self.runs_to_arrays(compressed_data)
+        return self.rle_decompress_vectorized(values, counts).tolist()
+    
+    def runs_to_arrays(self, compressed_data):
+        """Convertir una lista de tuplas (valor, cuenta) en los arrays paralelos"""
+        runs = np.array(compressed_data, dtype=np.int64).reshape(-1, 2)
+        return runs[:, 0], runs[:, 1]
+    
+    def rle_decompress_vectorized(self, values, counts):
+        return np.repeat(values, counts)
+    
+    def encode_varints(self, counts):
+        """Codificar enteros no negativos como varints LEB128 (7 bits por byte, bit alto = continúa)"""
+        counts = np.asarray(counts, dtype=np.uint64)
+        sizes = np.ones(len(counts), dtype=np.int64)
+        for extra in range(1, MAX_VARINT_BYTES):
+            sizes += counts >= np.uint64(1 << (7 * extra))
+        starts = np.cumsum(sizes) - sizes
+        
+        output = np.empty(int(sizes.sum()), dtype=np.uint8)
+        for byte in range(int(sizes.max(initial=0))):
+            present = sizes > byte
+            chunk = (counts[present] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+            more = np.where(sizes[present] > byte + 1, 0x80, 0)
+            output[starts[present] + byte] = chunk.astype(np.uint8) | more.astype(np.uint8)
+        return output
+    
+    def decode_varints(self, data):
+        """Inverso de encode_varints: devolver los enteros como array int64"""
+        data = np.asarray(data, dtype=np.uint8)
+        ends = np.flatnonzero(data < 0x80)
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        sizes = ends - starts + 1
+        
+        counts = np.zeros(len(ends), dtype=np.int64)
+        for byte in range(int(sizes.max(initial=0))):
+            present = sizes > byte
+            counts[present] |= (data[starts[present] + byte].astype(np.int64) & 0x7F) << (7 * byte)
+        return counts
+    
+    def tile_boxes(self, original_shape, tile_height, tile_width):
+        """Cajas (top, left, bottom, right) de las teselas, por filas"""
+        height, width = original_shape[:2]
+        return [(top, left, min(top + tile_height, height), min(left + tile_width, width))
+                for top in range(0, height, tile_height)
+                for left in range(0, width, tile_width)]
+    
+    def pack_colors(self, pixels):
+        """Empaquetar los canales de cada píxel (..., canales) en un entero para compararlos de una vez"""
+        packed = np.zeros(pixels.shape[:-1], dtype=np.uint32)
+        for channel in range(pixels.shape[-1]):
+            packed |= pixels[..., channel].astype(np.uint32) << (8 * channel)
+        return packed
+    
+    def find_palette(self, tile):
+        """Si la tesela tiene como mucho 256 colores, devolver (paleta (n, canales), índices uint8)"""
+        if tile.ndim != 3 or tile.size == 0:
+            return None
+        # Descartar primero con una muestra de píxeles: en fotos ya supera los 256 colores
+        pixels = tile.reshape(-1, tile.shape[2])
+        sample = pixels[::max(len(pixels) // PALETTE_SAMPLE, 1)]
+        if len(np.unique(self.pack_colors(sample))) > 256:
+            return None
+        colors, indices = np.unique(self.pack_colors(tile), return_inverse=True)
+        if len(colors) > 256:
+            return None
+        palette = np.stack([(colors >> (8 * channel)) & 0xFF for channel in range(tile.shape[2])], axis=-1)
+        return palette.astype(np.uint8), indices.reshape(tile.shape[:2]).astype(np.uint8)
+    
+    def encode_planes(self, planes, run_coding):
+        """Por plano, número de runs y tamaño de las cuentas en bytes ('<QQ'); después los
+        valores y las cuentas de cada plano"""
+        plane_runs = []
+        for plane in planes:
+            if run_coding == RUN_CODING_VARINT:
+                values, counts = self.rle_compress_vectorized(plane, max_run=None)
+                counts = self.encode_varints(counts)
+            else:
+                values, counts = self.rle_compress_vectorized(plane)
+            plane_runs.append((values, counts))
+        
+        sizes = [size for values, counts in plane_runs for size in (len(values), len(counts))]
+        parts = [struct.pack(f'<{len(sizes)}Q', *sizes)]
+        for values, counts in plane_runs:
+            parts.append(np.ascontiguousarray(values, dtype=np.uint8).tobytes())
+            parts.append(counts.tobytes())
+        return b"".join(parts)
+    
+    def decode_planes(self, data, offset, plane_count, run_coding):
+        """Inverso de encode_planes: devolver (planos aplanados, offset tras el último)"""
+        sizes = struct.unpack(f'<{2 * plane_count}Q', data[offset:offset + 16 * plane_count].tobytes())
+        offset += 16 * plane_count
+        planes = []
+        for run_count, counts_size in zip(sizes[::2], sizes[1::2]):
+            values = data[offset:offset + run_count]
+            counts = data[offset + run_count:offset + run_count + counts_size]
+            if run_coding == RUN_CODING_VARINT:
+                counts = self.decode_varints(counts)
+            planes.append(self.rle_decompress_vectorized(values, counts))
+            offset += run_count + counts_size
+        return planes, offset
+    
+    def encode_tile(self, tile, options):
+        """Codificar una tesela según options ('filtered', 'run_coding', 'palette', 'quadtree')
+        
+        Con palette, la tesela empieza con el número de colores ('<H', 0 si no hay paleta)
+        y la paleta; si cabe en 256 colores se codifica un único plano de índices en vez de
+        uno por canal. Con quadtree siguen el número de nodos ('<Q'), sus bits y un plano
+        por canal con los valores de las hojas. Si no, con filtered van los tipos de filtro
+        de cada fila y el RLE se aplica a los residuos, que en imágenes suaves son casi
+        todos cero.
+        """
+        parts = []
+        filter_count = options['filter_count']
+        if options['palette']:
+            found = self.find_palette(tile)
+            if found is None:
+                parts.append(struct.pack('<H', 0))
+            else:
+                palette, tile = found
+                parts += [struct.pack('<H', len(palette)), palette.tobytes()]
+                # Los índices no son ordinales: solo tiene sentido predecir igualdades (Sub y Up)
+                filter_count = min(filter_count, FILTER_UP + 1)
+        
+        if options['quadtree']:
+            flags, leaves = self.quadtree.encode(tile if tile.ndim == 3 else tile[:, :, None])
+            parts += [struct.pack('<Q', len(flags)), np.packbits(flags).tobytes(),
+                      self.encode_planes([leaves[:, channel] for channel in range(leaves.shape[1])],
+                                         options['run_coding'])]
+            return b"".join(parts)
+        
+        if options['filtered']:
+            filter_types, tile = self.row_filter.apply(tile, filter_count)
+            parts.append(filter_types.tobytes())
+        planes = [tile] if tile.ndim == 2 else [tile[:, :, channel] for channel in range(tile.shape[2])]
+        parts.append(self.encode_planes(planes, options['run_coding']))
+        return b"".join(parts)
     
-    def compress(self, input_file):
+    def decode_tile(self, data, offset, tile_shape, header):
+        """Decodificar la tesela que empieza en data[offset] (data es un array uint8)"""
+        palette = None
+        if header['palette']:
+            colors = struct.unpack('<H', data[offset:offset + 2].tobytes())[0]
+            offset += 2
+            if colors:
+                palette = np.array(data[offset:offset + colors * header['channels']]).reshape(colors, -1)
+                offset += palette.size
+                # Con paleta se guarda un único plano de índices
+                tile_shape = tile_shape[:2]
+        
+        if header['quadtree']:
+            flag_count = struct.unpack('<Q', data[offset:offset + 8].tobytes())[0]
+            offset += 8
+            flags = np.unpackbits(data[offset:offset + (flag_count + 7) // 8], count=flag_count).astype(bool)
+            offset += (flag_count + 7) // 8
+            channels = 1 if len(tile_shape) == 2 else tile_shape[2]
+            planes, _ = self.decode_planes(data, offset, channels, header['run_coding'])
+            tile = self.quadtree.decode(flags, np.stack(planes, axis=-1), tile_shape[:2] + (channels,))
+            tile = tile.reshape(tile_shape)
+            return tile if palette is None else palette[tile]
+        
+        if header['filtered']:
+            filter_types = data[offset:offset + tile_shape[0]]
+            offset += tile_shape[0]
+        planes, _ = self.decode_planes(data, offset, 1 if len(tile_shape) == 2 else tile_shape[2],
+                                       header['run_coding'])
+        
+        if len(tile_shape) == 2:
+            tile = planes[0].reshape(tile_shape)
+        else:
+            # Intercalar los canales en un solo paso
+            tile = np.stack(planes, axis=-1).reshape(tile_shape)
+        if header['filtered']:
+            tile = self.row_filter.invert(filter_types, tile)
+        if palette is not None:
+            # Un solo acceso indexado reconstruye todos los canales
+            tile = palette[tile]
+        return tile
+    
+    def make_preview(self, img):
+        """Reducir img para que quepa en PREVIEW_SIZE x PREVIEW_SIZE conservando la proporción"""
+        width, height = img.size
+        scale = min(PREVIEW_SIZE / max(width, height, 1), 1)
+        size = (max(round(width * scale), 1), max(round(height * scale), 1))
+        if width == 0 or height == 0:
+            return None
+        if size == img.size:
+            return img
+        # BOX promedia cada bloque de píxeles; con paleta o binarias solo tiene sentido NEAREST
+        resample = Image.NEAREST if img.mode in ('1', 'P') else Image.BOX
+        return img.resize(size, resample)
+    
+    def write_header(self, file, original_shape, mode, tile_height, tile_width, options, preview=None, magic=MAGIC):
+        channels = 1 if len(original_shape) == 2 else original_shape[2]
+        file.write(struct.pack(HEADER_FORMAT, magic, FORMAT_VERSION, mode.encode('ascii'),
+                               len(original_shape), original_shape[0], original_shape[1], channels,
+                               tile_height, tile_width, options['filtered'], options['run_coding'],
+                               options['palette'], options['quadtree']))
+        if preview is None:
+            file.write(struct.pack(PREVIEW_FORMAT, 0, 0, 0, 0))
+        else:
+            raw = np.array(preview)
+            encoded = self.encode_tile(raw, PREVIEW_OPTIONS)
+            is_encoded = len(encoded) < raw.nbytes
+            if not is_encoded:
+                encoded = raw.tobytes()
+            file.write(struct.pack(PREVIEW_FORMAT, preview.size[0], preview.size[1], is_encoded, len(encoded)))
+            file.write(encoded)
+    
+    def write_index(self, file, offsets):
+        """Añadir al final la tabla de offsets de las teselas y la posición donde empieza"""
+        index_offset = file.tell()
+        file.write(np.array(offsets, dtype='<u8').tobytes())
+        file.write(struct.pack('<Q', index_offset))
+    
+    def parse_header(self, data, magic=MAGIC):
+        header_size = struct.calcsize(HEADER_FORMAT)
+        if len(data) < header_size + 8 or data[:4].tobytes() != magic:
+            raise Exception("El archivo no es un contenedor RLE válido")
+        _, version, mode, ndim, height, width, channels, tile_height, tile_width, filtered, run_coding, palette, \
+            quadtree = \
+            struct.unpack(HEADER_FORMAT, data[:header_size].tobytes())
+        if version != FORMAT_VERSION:
+            raise Exception(f"Versión de contenedor RLE no soportada: {version}")
+        preview_width, preview_height, preview_encoded, preview_size = struct.unpack(
+            PREVIEW_FORMAT, data[header_size:header_size + struct.calcsize(PREVIEW_FORMAT)].tobytes())
+        preview_offset = header_size + struct.calcsize(PREVIEW_FORMAT)
+        
+        return {
+            'original_shape': (height, width) if ndim == 2 else (height, width, channels),
+            'mode': mode.rstrip(b'\0').decode('ascii'),
+            'channels': channels,
+            'tile_size': (tile_height, tile_width),
+            'filtered': bool(filtered),
+            'run_coding': run_coding,
+            'palette': bool(palette),
+            'quadtree': bool(quadtree),
+            'preview_shape': (preview_height, preview_width) + ((channels,) if ndim == 3 else ()),
+            'preview_offset': preview_offset if preview_size else None,
+            'preview_encoded': bool(preview_encoded),
+            # Primer byte tras la cabecera y la vista previa
+            'header_size': preview_offset + preview_size
+        }
+    
+    def read_index(self, data):
+        """Leer la tabla de offsets que termina justo antes de los 8 bytes finales"""
+        index_offset = struct.unpack('<Q', data[-8:].tobytes())[0]
+        return np.frombuffer(data[index_offset:len(data) - 8].tobytes(), dtype='<u8').tolist()
+    
+    def read_container(self, input_file):
+        """Mapear el archivo con np.memmap y leer la cabecera y el índice de teselas"""
+        data = np.memmap(input_file, dtype=np.uint8, mode='r')
+        header = self.parse_header(data)
+        boxes = self.tile_boxes(header['original_shape'], *header['tile_size'])
+        return data, header, list(zip(boxes, self.read_index(data)))
+    
+    def output_path(self, input_file, suffix, extension):
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.splitext(os.path.basename(input_file))[0]
+        return os.path.join(self.output_dir, f"{filename}_{suffix}_{timestamp}.{extension}")
+    
+    def tile_options(self, filters, all_filters, run_coding, palette, quadtree):
+        """Opciones de codificación de las teselas a partir de los parámetros de compress"""
+        filter_count = FILTER_PAETH + 1 if all_filters else FILTER_UP + 1
+        return {'filtered': filters and not quadtree, 'filter_count': filter_count, 'run_coding': run_coding,
+                'palette': palette, 'quadtree': quadtree}
+    
+    def compress(self, input_file, tile_size=None, workers=None, filters=True, run_coding=RUN_CODING_VARINT,
+                 palette=True, quadtree=False, all_filters=False):
+        """Comprimir una imagen; con tile_size se divide en teselas codificadas en un pool de procesos
+        
+        Con filters se aplica a cada fila el filtro predictivo (None/Sub/Up) que deja menos
+        runs antes del RLE; all_filters prueba también Average y Paeth, que a veces reducen
+        algo más pero obligan a decodificar por antidiagonales, mucho más despacio.
+        run_coding elige cómo se guardan las longitudes de los runs (RUN_CODING_BYTE o
+        RUN_CODING_VARINT). Con palette, las teselas en color con 256 colores o menos se
+        guardan como paleta más plano de índices.
+        Con quadtree cada tesela se parte en bloques cuadrados uniformes en vez de usar
+        filtros y RLE por filas, lo que aprovecha las zonas planas de capturas y documentos.
+        """
         try:
             img = Image.open(input_file)
         except Exception as e:
             raise Exception(f"No se pudo cargar la imagen: {str(e)}")
         
         img_array = np.array(img)
-        compressed_channels = []
         original_shape = img_array.shape
-        
-        if len(original_shape) == 2:
-            compressed_data = self.rle_compress(img_array.flatten().tolist())
-            compressed_channels.append(compressed_data)
+        if tile_size:
+            tile_height = tile_width = tile_size
         else:
-            for channel in range(original_shape[2]):
-                channel_data = img_array[:, :, channel].flatten().tolist()
-                compressed_data = self.rle_compress(channel_data)
-                compressed_channels.append(compressed_data)
+            # Sin teselas la imagen entera es una sola tesela
+            tile_height, tile_width = max(original_shape[0], 1), max(original_shape[1], 1)
+        boxes = self.tile_boxes(original_shape, tile_height, tile_width)
+        output_file = self.output_path(input_file, "compressed", "rle")
+        options = self.tile_options(filters, all_filters, run_coding, palette, quadtree)
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = os.path.join(self.output_dir, f"{filename}_compressed_{timestamp}.rle")
+        with open(output_file, 'wb') as file:
+            self.write_header(file, original_shape, img.mode, tile_height, tile_width, options,
+                              self.make_preview(img))
+            offsets = []
+            if len(boxes) <= 1:
+                for top, left, bottom, right in boxes:
+                    offsets.append(file.tell())
+                    file.write(self.encode_tile(img_array[top:bottom, left:right], options))
+            else:
+                workers = workers or os.cpu_count() or 1
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    # Se limita el número de teselas en vuelo, como en la compresión de texto por bloques
+                    pending = deque()
+                    for top, left, bottom, right in boxes:
+                        pending.append(executor.submit(self.encode_tile, img_array[top:bottom, left:right], options))
+                        if len(pending) >= 2 * workers:
+                            offsets.append(file.tell())
+                            file.write(pending.popleft().result())
+                    while pending:
+                        offsets.append(file.tell())
+                        file.write(pending.popleft().result())
+            self.write_index(file, offsets)
         
-        compressed_data = {
-            'compressed_channels': compressed_channels,
-            'original_shape': original_shape,
-            'mode': img.mode
-        }
+        return output_file
+    
+    def compress_stream(self, input_file, strip_rows=DEFAULT_STRIP_ROWS, filters=True, run_coding=RUN_CODING_VARINT,
+                        palette=True, quadtree=False, all_filters=False):
+        """Comprimir por franjas horizontales de strip_rows filas, escribiendo cada una al terminarla
+        
+        Solo se convierte a array la franja actual, así que la memoria de trabajo (arrays,
+        residuos de los filtros y runs) es proporcional a la franja y no a la imagen.
+        Cada franja es una tesela de ancho completo, así que el resultado se lee igual.
+        """
+        try:
+            img = Image.open(input_file)
+        except Exception as e:
+            raise Exception(f"No se pudo cargar la imagen: {str(e)}")
+        
+        width, height = img.size
+        channels = len(img.getbands())
+        original_shape = (height, width) if channels == 1 else (height, width, channels)
+        strip_rows = max(strip_rows, 1)
+        output_file = self.output_path(input_file, "compressed", "rle")
+        options = self.tile_options(filters, all_filters, run_coding, palette, quadtree)
         
         with open(output_file, 'wb') as file:
-            pickle.dump(compressed_data, file)
+            self.write_header(file, original_shape, img.mode, strip_rows, max(width, 1), options,
+                              self.make_preview(img))
+            offsets = []
+            for top, left, bottom, right in self.tile_boxes(original_shape, strip_rows, max(width, 1)):
+                strip = np.array(img.crop((left, top, right, bottom)))
+                offsets.append(file.tell())
+                file.write(self.encode_tile(strip, options))
+            self.write_index(file, offsets)
         
         return output_file
     
-    def decompress(self, input_file):
-        with open(input_file, 'rb') as file:
-            compressed_data = pickle.load(file)
+    def decode_box(self, input_file, box=None, out=None):
+        """Decodificar solo las teselas que cortan box = (left, upper, right, lower)
         
-        compressed_channels = compressed_data['compressed_channels']
-        original_shape = compressed_data['original_shape']
-        mode = compressed_data['mode']
+        Los píxeles se escriben en out si se pasa (por ejemplo un np.memmap) o en un array nuevo.
+        """
+        data, header, tiles = self.read_container(input_file)
+        original_shape = header['original_shape']
+        if box is None:
+            box = (0, 0, original_shape[1], original_shape[0])
+        left, upper, right, lower = box
+        if not (0 <= left <= right <= original_shape[1] and 0 <= upper <= lower <= original_shape[0]):
+            raise Exception(f"Región fuera de la imagen: {box}")
         
-        decompressed_channels = []
-        for compressed_channel in compressed_channels:
-            decompressed_data = self.rle_decompress(compressed_channel)
-            decompressed_channels.append(decompressed_data)
+        region_shape = (lower - upper, right - left) + tuple(original_shape[2:])
+        region = np.empty(region_shape, dtype=np.uint8) if out is None else out
+        for (top, tile_left, bottom, tile_right), offset in tiles:
+            if bottom <= upper or top >= lower or tile_right <= left or tile_left >= right:
+                continue
+            tile_shape = (bottom - top, tile_right - tile_left) + tuple(original_shape[2:])
+            tile = self.decode_tile(data, offset, tile_shape, header)
+            rows = slice(max(top, upper), min(bottom, lower))
+            columns = slice(max(tile_left, left), min(tile_right, right))
+            region[rows.start - upper:rows.stop - upper, columns.start - left:columns.stop - left] = \
+                tile[rows.start - top:rows.stop - top, columns.start - tile_left:columns.stop - tile_left]
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = os.path.join(self.output_dir, f"{filename}_decompressed_{timestamp}.png")
+        return region, header['mode']
+    
+    def decompress(self, input_file):
+        img_array, mode = self.decode_box(input_file)
+        output_file = self.output_path(input_file, "decompressed", "png")
+        img = Image.fromarray(img_array, mode)
         
-        if len(original_shape) == 2:
-            img_array = np.array(decompressed_channels[0]).reshape(original_shape)
-            img = Image.fromarray(img_array.astype('uint8'), mode)
+        img.save(output_file)
+        return output_file
+    
+    def read_preview(self, input_file):
+        """Devolver como Image la vista previa guardada tras la cabecera, sin tocar las teselas
+        
+        Sirve para imágenes (.rle) y secuencias (.rles, vista previa del primer frame).
+        Devuelve None si el archivo no tiene vista previa (imagen vacía).
+        """
+        data = np.memmap(input_file, dtype=np.uint8, mode='r')
+        header = self.parse_header(data, SEQUENCE_MAGIC if data[:4].tobytes() == SEQUENCE_MAGIC else MAGIC)
+        if header['preview_offset'] is None:
+            return None
+        offset = header['preview_offset']
+        shape = header['preview_shape']
+        if header['preview_encoded']:
+            preview = self.decode_tile(data, offset, shape, dict(header, **PREVIEW_OPTIONS))
         else:
-            pixels = []
-            for i in range(len(decompressed_channels[0])):
-                pixel = []
-                for channel in decompressed_channels:
-                    pixel.append(channel[i])
-                pixels.append(pixel)
-            
-            img_array = np.array(pixels).reshape(original_shape)
-            img = Image.fromarray(img_array.astype('uint8'), mode)
+            preview = np.array(data[offset:offset + int(np.prod(shape))]).reshape(shape)
+        return Image.fromarray(preview, header['mode'])
+    
+    def decompress_region(self, input_file, box):
+        """Devolver como Image la región box = (left, upper, right, lower), como en Image.crop"""
+        region, mode = self.decode_box(input_file, box)
+        return Image.fromarray(region, mode)
+    
+    def decompress_stream(self, input_file):
+        """Decodificar tesela a tesela en un .npy mapeado en memoria (np.load(..., mmap_mode='r'))
         
-        img.save(output_file)
-        return output_file
\ No newline at end of file
+        A diferencia de decompress no se guarda PNG, que obligaría a tener la imagen entera
+        en memoria; el pico de memoria es el de una tesela o franja.
+        """
+        _, header, _ = self.read_container(input_file)
+        output_file = self.output_path(input_file, "decompressed", "npy")
+        output = np.lib.format.open_memmap(output_file, mode='w+', dtype=np.uint8, shape=header['original_shape'])
+        self.decode_box(input_file, out=output)
+        output.flush()
+        del output
+        return output_file
+    
+    def iter_frames(self, inputs):
+        """Recorrer los frames de un archivo multiframe (GIF, TIFF, APNG) o de una lista de rutas
+        
+        Todos los frames se convierten al modo del primero; los GIF con paleta propia por
+        frame se pasan a RGB (o RGBA si tienen transparencia).
+        """
+        try:
+            if isinstance(inputs, str):
+                frames = ImageSequence.Iterator(Image.open(inputs))
+            else:
+                frames = (Image.open(path) for path in inputs)
+            mode = None
+            for frame in frames:
+                if mode is None:
+                    mode = frame.mode
+                    if mode == 'P':
+                        mode = 'RGBA' if 'transparency' in frame.info else 'RGB'
+                yield frame.convert(mode)
+        except OSError as e:
+            raise Exception(f"No se pudo cargar la imagen: {str(e)}")
+    
+    def compress_sequence(self, inputs, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL, residual=RESIDUAL_XOR,
+                          filters=True, run_coding=RUN_CODING_VARINT, palette=True, quadtree=False,
+                          all_filters=False):
+        """Comprimir una secuencia guardando un keyframe cada keyframe_interval frames
+        
+        El resto de frames se guardan como residuo frente al anterior: XOR (RESIDUAL_XOR) o
+        resta módulo 256 (RESIDUAL_DIFF). En secuencias casi estáticas el residuo es casi
+        todo cero y el RLE lo reduce a unos pocos runs. Se lee de frame en frame, así que
+        solo se tienen en memoria el frame actual y el anterior.
+        """
+        frames = self.iter_frames(inputs)
+        first = next(frames, None)
+        if first is None:
+            raise Exception("La secuencia no tiene frames")
+        
+        name = inputs if isinstance(inputs, str) else inputs[0]
+        output_file = self.output_path(name, "compressed", "rles")
+        original_shape = np.array(first).shape
+        options = self.tile_options(filters, all_filters, run_coding, palette, quadtree)
+        keyframe_interval = max(keyframe_interval, 1)
+        
+        with open(output_file, 'wb') as file:
+            self.write_header(file, original_shape, first.mode, max(original_shape[0], 1),
+                              max(original_shape[1], 1), options, self.make_preview(first), SEQUENCE_MAGIC)
+            file.write(struct.pack(SEQUENCE_FORMAT, keyframe_interval, residual))
+            offsets = []
+            previous = None
+            for position, frame in enumerate(chain([first], frames)):
+                frame_array = np.array(frame)
+                if frame_array.shape != original_shape:
+                    raise Exception("Todos los frames de la secuencia deben tener el mismo tamaño")
+                if position % keyframe_interval == 0:
+                    stored = frame_array
+                elif residual == RESIDUAL_XOR:
+                    stored = np.bitwise_xor(frame_array, previous)
+                else:
+                    stored = frame_array - previous
+                offsets.append(file.tell())
+                file.write(self.encode_tile(stored, options))
+                previous = frame_array
+            self.write_index(file, offsets)
+        
+        return output_file
+    
+    def read_sequence(self, input_file):
+        """Mapear una secuencia y devolver (datos, cabecera, offsets de los frames)"""
+        data = np.memmap(input_file, dtype=np.uint8, mode='r')
+        header = self.parse_header(data, SEQUENCE_MAGIC)
+        header_size = header['header_size']
+        header['keyframe_interval'], header['residual'] = struct.unpack(
+            SEQUENCE_FORMAT, data[header_size:header_size + struct.calcsize(SEQUENCE_FORMAT)].tobytes())
+        return data, header, self.read_index(data)
+    
+    def apply_residual(self, previous, stored, residual):
+        if residual == RESIDUAL_XOR:
+            return np.bitwise_xor(previous, stored)
+        return previous + stored
+    
+    def decompress_frame(self, input_file, index):
+        """Devolver el frame index como Image, decodificando desde su keyframe anterior"""
+        data, header, offsets = self.read_sequence(input_file)
+        if not 0 <= index < len(offsets):
+            raise Exception(f"Frame fuera de la secuencia: {index}")
+        
+        keyframe = index - index % header['keyframe_interval']
+        frame = self.decode_tile(data, offsets[keyframe], header['original_shape'], header)
+        for position in range(keyframe + 1, index + 1):
+            stored = self.decode_tile(data, offsets[position], header['original_shape'], header)
+            frame = self.apply_residual(frame, stored, header['residual'])
+        return Image.fromarray(frame, header['mode'])
+    
+    def decompress_sequence(self, input_file):
+        """Decodificar todos los frames en orden y guardarlos como un TIFF multipágina"""
+        data, header, offsets = self.read_sequence(input_file)
+        images = []
+        frame = None
+        for position, offset in enumerate(offsets):
+            stored = self.decode_tile(data, offset, header['original_shape'], header)
+            if position % header['keyframe_interval'] == 0:
+                frame = stored
+            else:
+                frame = self.apply_residual(frame, stored, header['residual'])
+            images.append(Image.fromarray(frame, header['mode']))
+        
+        output_file = self.output_path(input_file, "decompressed", "tiff")
+        images[0].save(output_file, save_all=True, append_images=images[1:])
+        return output_file
@@ -0,0 +1,93 @@
+import numpy as np
+
+# Tipos de filtro por fila, con la misma numeración que PNG
+FILTER_NONE = 0
+FILTER_SUB = 1
+FILTER_UP = 2
+FILTER_AVERAGE = 3
+FILTER_PAETH = 4
+
+class RowFilter:
+    """Filtros predictivos por fila al estilo PNG sobre arrays (alto, ancho[, canales]) uint8
+    
+    Cada píxel se predice a partir del vecino izquierdo (a), el de arriba (b) y el de
+    arriba a la izquierda (c) del mismo canal; fuera del array los vecinos valen 0.
+    """
+    
+    def neighbours(self, array):
+        """Devolver (a, b, c) como int16, desplazando el array con relleno de ceros"""
+        padded = np.zeros((array.shape[0] + 1, array.shape[1] + 1) + array.shape[2:], dtype=np.int16)
+        padded[1:, 1:] = array
+        return padded[1:, :-1], padded[:-1, 1:], padded[:-1, :-1]
+    
+    def paeth(self, a, b, c):
+        p = a + b - c
+        pa = np.abs(p - a)
+        pb = np.abs(p - b)
+        pc = np.abs(p - c)
+        return np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+    
+    def predictions(self, a, b, c):
+        zero = np.zeros_like(a)
+        return [zero, a, b, (a + b) >> 1, self.paeth(a, b, c)]
+    
+    def apply(self, array, filter_count=FILTER_UP + 1):
+        """Elegir para cada fila el filtro cuyos residuos forman menos rachas
+        
+        El RLE codifica una entrada por racha, así que se cuentan los cambios de valor a lo
+        largo de la fila en vez de sumar residuos absolutos como PNG. Solo se prueban los
+        filtros menores que filter_count: por defecto None, Sub y Up, que se invierten fila
+        a fila; Average y Paeth (FILTER_PAETH + 1) obligan a invertir por antidiagonales.
+        Devuelve (tipos de filtro uint8 por fila, residuos uint8 con la forma de array).
+        """
+        if array.size == 0:
+            return np.zeros(array.shape[0], dtype=np.uint8), array.astype(np.uint8)
+        x = array.astype(np.int16)
+        predictions = self.predictions(*self.neighbours(array))[:filter_count]
+        residuals = [((x - prediction) & 0xFF).astype(np.uint8) for prediction in predictions]
+        row_cost = np.stack([np.count_nonzero(np.diff(residual, axis=1).reshape(array.shape[0], -1), axis=1)
+                             for residual in residuals])
+        filter_types = np.argmin(row_cost, axis=0).astype(np.uint8)
+        chosen = np.empty_like(residuals[0])
+        for filter_type, residual in enumerate(residuals):
+            rows = filter_types == filter_type
+            chosen[rows] = residual[rows]
+        return filter_types, chosen
+    
+    def invert(self, filter_types, residuals):
+        """Reconstruir el array original a partir de los tipos de filtro y los residuos"""
+        if residuals.size == 0:
+            return residuals.astype(np.uint8)
+        if np.any(filter_types >= FILTER_AVERAGE):
+            return self.invert_wavefront(filter_types, residuals)
+        
+        # Sin Average ni Paeth cada fila depende solo de la anterior y se reconstruye entera de golpe
+        output = np.empty(residuals.shape, dtype=np.uint8)
+        previous = np.zeros(residuals.shape[1:], dtype=np.uint8)
+        for row, filter_type in enumerate(filter_types.tolist()):
+            if filter_type == FILTER_SUB:
+                output[row] = np.cumsum(residuals[row], axis=0, dtype=np.uint8)
+            elif filter_type == FILTER_UP:
+                output[row] = residuals[row] + previous
+            else:
+                output[row] = residuals[row]
+            previous = output[row]
+        return output
+    
+    def invert_wavefront(self, filter_types, residuals):
+        """Reconstruir por antidiagonales: sus píxeles solo dependen de la antidiagonal anterior"""
+        height, width = residuals.shape[:2]
+        padded = np.zeros((height + 1, width + 1) + residuals.shape[2:], dtype=np.int16)
+        row_filters = filter_types.astype(np.intp)
+        
+        for diagonal in range(height + width - 1):
+            rows = np.arange(max(0, diagonal - width + 1), min(height, diagonal + 1))
+            columns = diagonal - rows
+            a = padded[rows + 1, columns]
+            b = padded[rows, columns + 1]
+            c = padded[rows, columns]
+            filters = row_filters[rows].reshape((-1,) + (1,) * (residuals.ndim - 2))
+            prediction = np.choose(np.broadcast_to(filters, a.shape), self.predictions(a, b, c))
+            padded[rows + 1, columns + 1] = (residuals[rows, columns] + prediction) & 0xFF
+        
+        return padded[1:, 1:].astype(np.uint8)
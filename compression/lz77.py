@@ -0,0 +1,81 @@
+MIN_MATCH = 3
+MAX_MATCH = 258
+DEFAULT_WINDOW = 32768
+
+class LZ77:
+    """Búsqueda de coincidencias LZ77 con cadenas hash sobre prefijos de MIN_MATCH símbolos"""
+    
+    def __init__(self, window=DEFAULT_WINDOW, max_chain=32, max_match=MAX_MATCH):
+        self.window = window
+        self.max_chain = max_chain
+        self.max_match = max_match
+    
+    def match_length(self, data, candidate, position, limit):
+        """Longitud común entre data[candidate:] y data[position:], comparando por tramos"""
+        length = 0
+        while length + 16 <= limit and data[candidate + length:candidate + length + 16] == data[position + length:position + length + 16]:
+            length += 16
+        while length < limit and data[candidate + length] == data[position + length]:
+            length += 1
+        return length
+    
+    def tokenize(self, data):
+        """Devolver la lista de tokens: un símbolo literal o una tupla (longitud, distancia)"""
+        tokens = []
+        head = {}
+        previous = [-1] * len(data)
+        size = len(data)
+        position = 0
+        
+        while position < size:
+            best_length = 0
+            best_distance = 0
+            limit = min(self.max_match, size - position)
+            
+            if limit >= MIN_MATCH:
+                candidate = head.get(data[position:position + MIN_MATCH], -1)
+                chain = self.max_chain
+                while candidate >= 0 and position - candidate <= self.window and chain:
+                    # Descartar rápido candidatos que no pueden mejorar la mejor coincidencia
+                    if data[candidate + best_length] == data[position + best_length]:
+                        length = self.match_length(data, candidate, position, limit)
+                        if length > best_length:
+                            best_length = length
+                            best_distance = position - candidate
+                            if length == limit:
+                                break
+                    candidate = previous[candidate]
+                    chain -= 1
+            
+            step = best_length if best_length >= MIN_MATCH else 1
+            if step > 1:
+                tokens.append((best_length, best_distance))
+            else:
+                tokens.append(data[position])
+            
+            # Insertar en las cadenas hash todas las posiciones consumidas
+            for inserted in range(position, min(position + step, size - MIN_MATCH + 1)):
+                key = data[inserted:inserted + MIN_MATCH]
+                previous[inserted] = head.get(key, -1)
+                head[key] = inserted
+            position += step
+        
+        return tokens
+    
+    def bucket(self, value):
+        """Separar un valor en (cubeta, bits extra, valor extra) con cubetas logarítmicas"""
+        if value < 4:
+            return value, 0, 0
+        high_bit = value.bit_length() - 1
+        extra_bits = high_bit - 1
+        second_bit = (value >> extra_bits) & 1
+        base = (2 | second_bit) << extra_bits
+        return 2 * high_bit + second_bit, extra_bits, value - base
+    
+    def bucket_base(self, bucket):
+        """Inverso de bucket: devolver (valor base, bits extra)"""
+        if bucket < 4:
+            return bucket, 0
+        high_bit = bucket // 2
+        extra_bits = high_bit - 1
+        return (2 | (bucket & 1)) << extra_bits, extra_bits
\ No newline at end of file
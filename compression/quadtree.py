@@ -0,0 +1,86 @@
+import numpy as np
+
+# Las raíces son bloques de 2^QUADTREE_MAX_LEVEL píxeles de lado como mucho
+QUADTREE_MAX_LEVEL = 8
+
+class Quadtree:
+    """Partición recursiva de una tesela en bloques cuadrados uniformes
+    
+    La uniformidad de cada nivel se calcula de abajo arriba con reshape sobre el nivel
+    anterior; el árbol se recorre por niveles de arriba abajo, así que cada nivel es una
+    sola operación vectorizada. Por nivel se guarda un bit por nodo (1 = hoja uniforme)
+    y cada hoja guarda su valor una sola vez.
+    """
+    
+    def __init__(self, max_level=QUADTREE_MAX_LEVEL):
+        self.max_level = max_level
+    
+    def root_level(self, height, width):
+        return min(max(int(np.ceil(np.log2(max(height, width, 1)))), 0), self.max_level)
+    
+    def padded_shape(self, height, width, level):
+        size = 1 << level
+        return -(-height // size) * size, -(-width // size) * size
+    
+    def encode(self, tile):
+        """Devolver (bits por nodo como bool, valores de las hojas (n, canales)) para tile (alto, ancho, canales)"""
+        height, width = tile.shape[:2]
+        level = self.root_level(height, width)
+        padded_height, padded_width = self.padded_shape(height, width, level)
+        # El relleno repite el borde para no romper bloques uniformes; se recorta al decodificar
+        values = np.pad(tile, ((0, padded_height - height), (0, padded_width - width), (0, 0)), mode='edge')
+        
+        # Pirámide de abajo arriba: un bloque es uniforme si sus cuatro hijos lo son y valen lo mismo
+        pyramid = [(values, np.ones(values.shape[:2], dtype=bool))]
+        for _ in range(level):
+            children, uniform = pyramid[-1]
+            rows, columns = uniform.shape[0] // 2, uniform.shape[1] // 2
+            children = children.reshape(rows, 2, columns, 2, -1)
+            first = children[:, :1, :, :1]
+            same = np.all(children == first, axis=(1, 3, 4))
+            uniform = uniform.reshape(rows, 2, columns, 2).all(axis=(1, 3)) & same
+            pyramid.append((first[:, 0, :, 0], uniform))
+        
+        flags = []
+        leaves = []
+        ys, xs = np.indices(pyramid[level][1].shape).reshape(2, -1)
+        for current in range(level, -1, -1):
+            values, uniform = pyramid[current]
+            is_leaf = uniform[ys, xs]
+            if current:
+                flags.append(is_leaf)
+            leaves.append(values[ys[is_leaf], xs[is_leaf]])
+            # Los cuatro hijos de cada nodo partido, en orden fila a fila
+            ys = (2 * ys[~is_leaf])[:, None] + np.array([0, 0, 1, 1])
+            xs = (2 * xs[~is_leaf])[:, None] + np.array([0, 1, 0, 1])
+            ys, xs = ys.ravel(), xs.ravel()
+        
+        flags = np.concatenate(flags) if flags else np.zeros(0, dtype=bool)
+        return flags, np.concatenate(leaves)
+    
+    def decode(self, flags, leaves, tile_shape):
+        """Rellenar cada hoja con una asignación sobre una vista (bloques, lado, bloques, lado, canales)"""
+        height, width, channels = tile_shape
+        level = self.root_level(height, width)
+        padded_height, padded_width = self.padded_shape(height, width, level)
+        output = np.empty((padded_height, padded_width, channels), dtype=np.uint8)
+        
+        ys, xs = np.indices((padded_height >> level, padded_width >> level)).reshape(2, -1)
+        flag_position = 0
+        leaf_position = 0
+        for current in range(level, -1, -1):
+            if current:
+                is_leaf = flags[flag_position:flag_position + len(ys)]
+                flag_position += len(ys)
+            else:
+                is_leaf = np.ones(len(ys), dtype=bool)
+            count = int(is_leaf.sum())
+            size = 1 << current
+            blocks = output.reshape(padded_height // size, size, padded_width // size, size, channels)
+            blocks[ys[is_leaf], :, xs[is_leaf], :] = leaves[leaf_position:leaf_position + count, None, None, :]
+            leaf_position += count
+            ys = (2 * ys[~is_leaf])[:, None] + np.array([0, 0, 1, 1])
+            xs = (2 * xs[~is_leaf])[:, None] + np.array([0, 1, 0, 1])
+            ys, xs = ys.ravel(), xs.ravel()
+        
+        return output[:height, :width]
@@ -0,0 +1,160 @@
+import numpy as np
+
+# Límite inferior del estado rANS (estado en [RANS_L, RANS_L << 8), renormalización por bytes)
+RANS_L = 1 << 23
+# Símbolos por carril: cada carril añade 8 bytes de cabecera (estado y longitud de su flujo)
+LANE_SYMBOLS = 4096
+MAX_LANES = 1024
+
+class RansCoder:
+    """Codificador rANS con muchos carriles, cada uno con su propio flujo de bytes
+    
+    El símbolo i va al carril i % carriles. Como los carriles son independientes, cada
+    paso codifica o decodifica un símbolo de todos ellos a la vez con operaciones de
+    NumPy, y el bucle de Python da len(data) / carriles vueltas en vez de len(data).
+    """
+    
+    def __init__(self, lane_symbols=LANE_SYMBOLS, max_lanes=MAX_LANES, scale_bits=12):
+        self.lane_symbols = lane_symbols
+        self.max_lanes = max_lanes
+        self.scale_bits = scale_bits
+    
+    def quantize_frequencies(self, frequency, scale_bits):
+        """Escalar las frecuencias para que sumen 2^scale_bits, con mínimo 1 por símbolo"""
+        total = sum(frequency.values())
+        target = 1 << scale_bits
+        quantized = {symbol: max(1, count * target // total) for symbol, count in frequency.items()}
+        
+        # Repartir la diferencia empezando por los símbolos más frecuentes
+        difference = target - sum(quantized.values())
+        by_frequency = sorted(quantized, key=lambda symbol: frequency[symbol], reverse=True)
+        while difference != 0:
+            for symbol in by_frequency:
+                if difference > 0:
+                    quantized[symbol] += 1
+                    difference -= 1
+                elif quantized[symbol] > 1:
+                    quantized[symbol] -= 1
+                    difference += 1
+                if difference == 0:
+                    break
+        
+        return quantized
+    
+    def symbol_codes(self, data):
+        """Devolver los códigos de los símbolos de data (str o bytes) como array de enteros"""
+        if isinstance(data, str):
+            return np.frombuffer(data.encode('utf-32-le'), dtype='<u4')
+        return np.frombuffer(bytes(data), dtype=np.uint8)
+    
+    def build_model(self, data, codes):
+        """Devolver (modelo, índice de cada símbolo de data dentro del modelo)"""
+        unique, indices, counts = np.unique(codes, return_inverse=True, return_counts=True)
+        if len(unique) > 1 << 15:
+            raise Exception("Demasiados símbolos distintos para el codificador rANS")
+        scale_bits = min(max(self.scale_bits, len(unique).bit_length() + 1), 16)
+        quantized = self.quantize_frequencies(dict(enumerate(counts.tolist())), scale_bits)
+        
+        if isinstance(data, str):
+            packed_symbols = ''.join(map(chr, unique.tolist()))
+        else:
+            packed_symbols = bytes(unique.tolist())
+        lanes = min(max(len(codes) // self.lane_symbols, 1), self.max_lanes)
+        model = {
+            'symbols': packed_symbols,
+            # Se guarda frecuencia - 1 para que 2^16 quepa en 16 bits
+            'frequencies': np.array([quantized[index] - 1 for index in range(len(unique))], dtype='<u2').tobytes(),
+            'scale_bits': scale_bits,
+            'lanes': lanes
+        }
+        return model, indices.reshape(-1)
+    
+    def model_tables(self, model):
+        """Reconstruir (frecuencia, acumulada) por índice de símbolo como arrays int64"""
+        frequencies = np.frombuffer(model['frequencies'], dtype='<u2').astype(np.int64) + 1
+        cumulative = np.concatenate(([0], np.cumsum(frequencies)[:-1]))
+        return frequencies, cumulative
+    
+    def encode(self, data):
+        """Codificar str o bytes; devuelve (bytes, modelo)
+        
+        El resultado empieza con el estado final de cada carril y la longitud de su flujo
+        ('<u4' cada uno) y sigue con los flujos de los carriles uno detrás de otro, ya en
+        el orden en que los lee el decodificador.
+        """
+        if not data:
+            return b"", {'symbols': data[:0], 'frequencies': b'', 'scale_bits': self.scale_bits, 'lanes': 1}
+        
+        model, indices = self.build_model(data, self.symbol_codes(data))
+        frequencies, cumulative = self.model_tables(model)
+        scale_bits = model['scale_bits']
+        lanes = model['lanes']
+        steps = -(-len(indices) // lanes)
+        bound = (RANS_L >> scale_bits) << 8
+        states = np.full(lanes, RANS_L, dtype=np.int64)
+        # Bytes emitidos en cada paso: como mucho dos por carril
+        emitted = np.zeros((steps, 2, lanes), dtype=np.uint8)
+        present = np.zeros((steps, 2, lanes), dtype=bool)
+        
+        for step in range(steps - 1, -1, -1):
+            symbols = indices[step * lanes:(step + 1) * lanes]
+            count = len(symbols)
+            freq = frequencies[symbols]
+            state = states[:count]
+            limit = bound * freq
+            for byte in range(2):
+                renormalize = state >= limit
+                emitted[step, byte, :count] = state & 0xFF
+                present[step, byte, :count] = renormalize
+                state = np.where(renormalize, state >> 8, state)
+            states[:count] = ((state // freq) << scale_bits) + (state % freq) + cumulative[symbols]
+        
+        # El decodificador lee cada carril al revés de como se emitió: pasos en orden y, dentro
+        # de cada paso, el segundo byte antes que el primero
+        emitted = emitted[:, ::-1].transpose(2, 0, 1).reshape(lanes, -1)
+        present = present[:, ::-1].transpose(2, 0, 1).reshape(lanes, -1)
+        header = np.concatenate((states, present.sum(axis=1))).astype('<u4')
+        return header.tobytes() + emitted[present].tobytes(), model
+    
+    def decode(self, encoded_bytes, model, length):
+        """Decodificar length símbolos; devuelve str o bytes según el tipo de los símbolos del modelo"""
+        if length == 0:
+            return model['symbols'][:0]
+        
+        scale_bits = model['scale_bits']
+        lanes = model['lanes']
+        mask = (1 << scale_bits) - 1
+        # Tablas por ranura: índice de símbolo, frecuencia y acumulada
+        frequencies, cumulative = self.model_tables(model)
+        slot_symbols = np.repeat(np.arange(len(frequencies)), frequencies)
+        slot_frequencies = frequencies[slot_symbols]
+        slot_cumulative = cumulative[slot_symbols]
+        
+        header = np.frombuffer(encoded_bytes, dtype='<u4', count=2 * lanes).astype(np.int64)
+        states = header[:lanes].copy()
+        lengths = header[lanes:]
+        # Un byte de relleno para que los carriles que ya han leído su flujo entero no se salgan
+        data = np.append(np.frombuffer(encoded_bytes, dtype=np.uint8, offset=8 * lanes), np.uint8(0))
+        positions = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        output = np.empty(length, dtype=np.intp)
+        
+        for step in range(-(-length // lanes)):
+            start = step * lanes
+            count = min(lanes, length - start)
+            state = states[:count]
+            slot = state & mask
+            output[start:start + count] = slot_symbols[slot]
+            state = slot_frequencies[slot] * (state >> scale_bits) + slot - slot_cumulative[slot]
+            # Tras decodificar el estado es >= 2^7, así que bastan como mucho dos bytes
+            for _ in range(2):
+                renormalize = state < RANS_L
+                position = positions[:count]
+                state = np.where(renormalize, (state << 8) | data[position], state)
+                positions[:count] = position + renormalize
+            states[:count] = state
+        
+        symbols = model['symbols']
+        if isinstance(symbols, str):
+            codes = np.array([ord(symbol) for symbol in symbols], dtype='<u4')
+            return codes[output].tobytes().decode('utf-32-le')
+        return np.frombuffer(symbols, dtype=np.uint8)[output].tobytes()
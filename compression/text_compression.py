@@ -1,8 +1,40 @@
+import hashlib
 import heapq
 import os
 import pickle
-from collections import Counter
+import re
+import struct
+from bisect import bisect_right
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+import numpy as np
+from compression.chunking import ContentDefinedChunker, CDC_MAX_SIZE
+from compression.lz77 import LZ77, MIN_MATCH, DEFAULT_WINDOW
+from compression.rans import RansCoder
+
+# Longitud máxima de los códigos canónicos (limita el tamaño de la tabla de decodificación)
+MAX_CODE_LENGTH = 15
+# Caracteres por bloque en el modo por bloques
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+# Archivos mayores que este tamaño (bytes) se comprimen por bloques automáticamente
+STREAM_THRESHOLD = 64 * 1024 * 1024
+# En el modo LZ77 los símbolos de longitud van detrás de todos los puntos de código Unicode
+LENGTH_SYMBOL_BASE = 0x110000
+# Símbolo de escape de los diccionarios de texto para caracteres no vistos al entrenar
+ESCAPE_SYMBOL = 0x110000
+# Diccionarios compartidos que se mantienen cargados en memoria
+DICTIONARY_CACHE_SIZE = 8
+# Bloques con diccionario: magia, relleno (bits 0-2) y binario (bit 3), ID del diccionario
+# en 8 bytes y después varints con el tamaño original y las longitudes de los bytes
+# codificados, los caracteres escapados (UTF-8) y la extensión original; siguen esos datos.
+# Sin pickle ni claves, un registro pequeño ocupa unos 14 bytes más que su carga útil
+DICTIONARY_BLOCK_MAGIC = b'D'
+DICTIONARY_BLOCK_FORMAT = '<cB8s'
+# Apariciones mínimas para que una palabra entre en el vocabulario del modo 'words'
+MIN_TOKEN_COUNT = 4
+# Palabras, secuencias de puntuación y de espacios: concatenadas reconstruyen el texto
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]+|\s+')
 
 class HuffmanNode:
     def __init__(self, char, freq):
@@ -15,12 +47,24 @@ class HuffmanNode:
         return self.freq < other.freq
 
 class TextCompressor:
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, lz77_window=DEFAULT_WINDOW, dictionary_dir=None):
         self.output_dir = output_dir
         os.makedirs(output_dir, exist_ok=True)
+        self.rans_coder = RansCoder()
+        self.lz77 = LZ77(window=lz77_window)
+        self.dictionary_dir = dictionary_dir or os.path.join(output_dir, "diccionarios")
+        self.dictionary_cache = OrderedDict()
+    
+    def __getstate__(self):
+        # La caché de diccionarios no se copia a los procesos del pool
+        state = self.__dict__.copy()
+        state['dictionary_cache'] = OrderedDict()
+        return state
     
     def build_huffman_tree(self, text):
-        frequency = Counter(text)
+        return self.build_tree_from_frequency(Counter(text))
+    
+    def build_tree_from_frequency(self, frequency):
         heap = [HuffmanNode(char, freq) for char, freq in frequency.items()]
         heapq.heapify(heap)
         
@@ -34,76 +78,954 @@ class TextCompressor:
         
         return heap[0] if heap else None
     
-    def build_codes(self, root):
+    def code_lengths(self, root):
+        """Obtener la profundidad de cada hoja del árbol (longitud de su código)"""
+        lengths = {}
+        stack = [(root, 0)] if root else []
+        
+        while stack:
+            node, depth = stack.pop()
+            if node.char is not None:
+                # Con un solo símbolo la raíz es hoja: se necesita al menos un bit
+                lengths[node.char] = max(depth, 1)
+            else:
+                stack.append((node.left, depth + 1))
+                stack.append((node.right, depth + 1))
+        
+        return lengths
+    
+    def limit_code_lengths(self, lengths, max_length=MAX_CODE_LENGTH):
+        """Recortar las longitudes a max_length manteniendo un código prefijo válido
+        
+        Como en zlib se trabaja con el número de códigos de cada longitud: los códigos
+        demasiado largos se recortan a max_length y el exceso de Kraft se paga alargando
+        los códigos más largos que aún lo admiten. Después las longitudes se reparten de
+        nuevo entre los símbolos, las más cortas para los que ya tenían código más corto.
+        """
+        max_length = max(max_length, (len(lengths) - 1).bit_length())
+        if not lengths or max(lengths.values()) <= max_length:
+            return lengths
+        
+        counts = [0] * (max_length + 1)
+        for length in lengths.values():
+            counts[min(length, max_length)] += 1
+        # Desigualdad de Kraft escalada: la suma de 2^(max - l) no puede superar 2^max
+        excess = sum(count << (max_length - length) for length, count in enumerate(counts)) - (1 << max_length)
+        
+        while excess > 0:
+            # Entre bits y max_length no hay códigos, así que cada código de bits se alarga hasta max_length
+            bits = max(length for length in range(1, max_length) if counts[length])
+            saving = (1 << (max_length - bits)) - 1
+            moved = min(counts[bits], excess // saving)
+            if moved:
+                counts[bits] -= moved
+                counts[max_length] += moved
+                excess -= moved * saving
+            else:
+                # Un código llevado hasta el final sobraría: alargarlo de bit en bit
+                counts[bits] -= 1
+                counts[bits + 1] += 1
+                excess -= 1 << (max_length - bits - 1)
+        
+        symbols = sorted(lengths, key=lambda symbol: lengths[symbol])
+        limited = {}
+        position = 0
+        for length, count in enumerate(counts):
+            for symbol in symbols[position:position + count]:
+                limited[symbol] = length
+            position += count
+        
+        return limited
+    
+    def canonical_codes(self, lengths):
+        """Asignar códigos canónicos a partir de las longitudes"""
         codes = {}
+        code = 0
+        previous_length = 0
         
-        def traverse(node, code):
-            if node:
-                if node.char is not None:
-                    codes[node.char] = code
-                traverse(node.left, code + '0')
-                traverse(node.right, code + '1')
+        for symbol in sorted(lengths, key=lambda symbol: (lengths[symbol], symbol)):
+            length = lengths[symbol]
+            code <<= length - previous_length
+            codes[symbol] = format(code, f'0{length}b')
+            code += 1
+            previous_length = length
         
-        traverse(root, '')
         return codes
     
+    def build_codes(self, root):
+        return self.canonical_codes(self.limit_code_lengths(self.code_lengths(root)))
+    
+    def pack_code_lengths(self, lengths):
+        """Cabecera compacta: símbolos en orden canónico y un byte de longitud por símbolo"""
+        symbols = sorted(lengths, key=lambda symbol: (lengths[symbol], symbol))
+        if all(isinstance(symbol, str) and len(symbol) == 1 for symbol in symbols):
+            packed_symbols = ''.join(symbols)
+        elif all(isinstance(symbol, int) and symbol < 256 for symbol in symbols):
+            packed_symbols = bytes(symbols)
+        else:
+            packed_symbols = symbols
+        return {
+            'symbols': packed_symbols,
+            'lengths': bytes(lengths[symbol] for symbol in symbols)
+        }
+    
+    def unpack_code_lengths(self, code_lengths):
+        return dict(zip(code_lengths['symbols'], code_lengths['lengths']))
+    
+    def pack_bits(self, text, codes, chunk_size=65536):
+        """Empaquetar los códigos en bytes reales; devuelve (bytes, bits de relleno)"""
+        return self.pack_bit_strings(
+            ''.join(codes[char] for char in text[start:start + chunk_size])
+            for start in range(0, len(text), chunk_size)
+        )
+    
+    def pack_bit_strings(self, chunks):
+        """Empaquetar una secuencia de cadenas de bits de cualquier longitud"""
+        packed = bytearray()
+        pending = ''
+        
+        for chunk in chunks:
+            bits = pending + chunk
+            usable = len(bits) - len(bits) % 8
+            if usable:
+                packed += int(bits[:usable], 2).to_bytes(usable // 8, 'big')
+            pending = bits[usable:]
+        
+        padding = (8 - len(pending)) % 8
+        if pending:
+            packed += int(pending + '0' * padding, 2).to_bytes(1, 'big')
+        
+        return bytes(packed), padding
+    
+    def pack_bits_vectorized(self, values, code_table, length_table, chunk_size=16384):
+        """Empaquetar bytes con tablas de códigos por byte usando operaciones de NumPy"""
+        code_table = code_table.astype(np.uint64)
+        length_table = length_table.astype(np.uint64)
+        histogram = np.bincount(values, minlength=256).astype(np.uint64)
+        total_bits = int(np.dot(histogram, length_table))
+        # Palabras de 32 bits acumuladas en float64: los bits de cada código no se solapan,
+        # así que sumar equivale a un OR y el resultado es exacto
+        words = np.zeros((total_bits + 31) // 32 + 1, dtype=np.float64)
+        position = 0
+        
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            lengths = length_table[chunk]
+            ends = np.cumsum(lengths)
+            starts = ends - lengths + np.uint64(position)
+            first_word = int(starts[0]) >> 5
+            word_index = (starts >> np.uint64(5)) - np.uint64(first_word)
+            # Cada código (<= 32 bits) alineado a la izquierda en un campo de 64 bits
+            field = code_table[chunk] << (np.uint64(64) - (starts & np.uint64(31)) - lengths)
+            count = int(word_index[-1]) + 1
+            words[first_word:first_word + count] += np.bincount(
+                word_index, weights=(field >> np.uint64(32)).astype(np.float64), minlength=count)
+            words[first_word + 1:first_word + 1 + count] += np.bincount(
+                word_index, weights=(field & np.uint64(0xFFFFFFFF)).astype(np.float64), minlength=count)
+            position += int(ends[-1])
+        
+        packed = words.astype(np.uint32).astype('>u4').tobytes()[:(total_bits + 7) // 8]
+        return packed, (8 - total_bits % 8) % 8
+    
+    def unpack_bits(self, encoded_bytes, padding):
+        """Convertir los bytes empaquetados de nuevo en una cadena de bits"""
+        if not encoded_bytes:
+            return ""
+        bits = bin(int.from_bytes(encoded_bytes, 'big'))[2:].zfill(len(encoded_bytes) * 8)
+        return bits[:len(bits) - padding]
+    
     def compress_text(self, text):
         if not text:
-            return "", {}
+            return b"", 0, self.pack_code_lengths({})
         
         root = self.build_huffman_tree(text)
-        codes = self.build_codes(root)
-        encoded_text = ''.join(codes[char] for char in text)
+        lengths = self.limit_code_lengths(self.code_lengths(root))
+        codes = self.canonical_codes(lengths)
+        encoded_bytes, padding = self.pack_bits(text, codes)
+        
+        return encoded_bytes, padding, self.pack_code_lengths(lengths)
+    
+    def tokenize_words(self, text):
+        """Dividir el texto en tokens; los poco frecuentes se escapan a caracteres sueltos"""
+        tokens = TOKEN_PATTERN.findall(text)
+        counts = Counter(tokens)
+        symbols = []
+        for token in tokens:
+            if len(token) == 1 or counts[token] >= MIN_TOKEN_COUNT:
+                symbols.append(token)
+            else:
+                symbols.extend(token)
+        return symbols
+    
+    def compress_words(self, text):
+        """Huffman sobre palabras: el mismo árbol y códigos canónicos con tokens como símbolos"""
+        return self.compress_text(self.tokenize_words(text))
+    
+    def compress_bytes_data(self, data):
+        """Huffman sobre bytes: histograma de 256 entradas y codificación vectorizada"""
+        if not data:
+            return b"", 0, self.pack_code_lengths({})
+        
+        values = np.frombuffer(data, dtype=np.uint8)
+        histogram = np.bincount(values, minlength=256)
+        frequency = {symbol: int(count) for symbol, count in enumerate(histogram) if count}
+        
+        root = self.build_tree_from_frequency(frequency)
+        lengths = self.limit_code_lengths(self.code_lengths(root))
+        code_table = np.zeros(256, dtype=np.uint32)
+        length_table = np.zeros(256, dtype=np.uint8)
+        for symbol, code in self.canonical_codes(lengths).items():
+            code_table[symbol] = int(code, 2)
+            length_table[symbol] = len(code)
+        
+        encoded_bytes, padding = self.pack_bits_vectorized(values, code_table, length_table)
+        return encoded_bytes, padding, self.pack_code_lengths(lengths)
+    
+    def build_decode_table(self, codes):
+        """Construir la tabla ventana de bits -> (símbolo, longitud del código)"""
+        table_bits = max(len(code) for code in codes.values())
+        table = [None] * (1 << table_bits)
+        
+        for char, code in codes.items():
+            shift = table_bits - len(code)
+            start = int(code, 2) << shift
+            table[start:start + (1 << shift)] = [(char, len(code))] * (1 << shift)
+        
+        return table, table_bits
+    
+    def decode_with_table(self, encoded_bytes, padding, table, table_bits):
+        """Decodificar un símbolo completo por consulta a la tabla"""
+        symbols = []
+        append = symbols.append
+        mask = (1 << table_bits) - 1
+        buffer = 0
+        available = 0
+        
+        for byte in memoryview(encoded_bytes)[:-1]:
+            buffer = (buffer << 8) | byte
+            available += 8
+            while available >= table_bits:
+                symbol, length = table[(buffer >> (available - table_bits)) & mask]
+                append(symbol)
+                available -= length
+            buffer &= (1 << available) - 1
+        
+        # Último byte: descartar el relleno y completar la ventana con ceros
+        buffer = ((buffer << 8) | encoded_bytes[-1]) >> padding
+        available += 8 - padding
+        while available > 0:
+            if available >= table_bits:
+                index = (buffer >> (available - table_bits)) & mask
+            else:
+                index = (buffer << (table_bits - available)) & mask
+            symbol, length = table[index]
+            append(symbol)
+            available -= length
+        
+        return symbols
+    
+    def decompress_text(self, encoded_bytes, padding, code_lengths):
+        if not encoded_bytes:
+            return ""
+        
+        # Los códigos canónicos se reconstruyen solo a partir de las longitudes
+        codes = self.canonical_codes(self.unpack_code_lengths(code_lengths))
+        table, table_bits = self.build_decode_table(codes)
+        symbols = self.decode_with_table(encoded_bytes, padding, table, table_bits)
+        
+        return ''.join(symbols)
+    
+    def decompress_bytes_data(self, encoded_bytes, padding, code_lengths):
+        if not encoded_bytes:
+            return b""
+        
+        codes = self.canonical_codes(self.unpack_code_lengths(code_lengths))
+        table, table_bits = self.build_decode_table(codes)
+        return bytes(self.decode_with_table(encoded_bytes, padding, table, table_bits))
+    
+    def decompress_legacy(self, encoded_text, codes):
+        """Decodificar el formato antiguo: bits como cadena '0'/'1' y diccionario de códigos"""
+        if not encoded_text:
+            return ""
+        
+        if max(len(code) for code in codes.values()) > MAX_CODE_LENGTH:
+            # Los códigos antiguos no tenían límite de longitud: la tabla no cabría, se va bit a bit
+            reverse_codes = {code: char for char, code in codes.items()}
+            symbols = []
+            current_code = ""
+            for bit in encoded_text:
+                current_code += bit
+                if current_code in reverse_codes:
+                    symbols.append(reverse_codes[current_code])
+                    current_code = ""
+            return ''.join(symbols)
+        
+        padding = -len(encoded_text) % 8
+        encoded_bytes = int(encoded_text + '0' * padding, 2).to_bytes((len(encoded_text) + padding) // 8, 'big')
+        table, table_bits = self.build_decode_table(codes)
+        return ''.join(self.decode_with_table(encoded_bytes, padding, table, table_bits))
+    
+    def compress_lz77_data(self, data):
+        """LZ77 + Huffman (estilo deflate): una tabla para literales/longitudes y otra para distancias"""
+        if not data:
+            return b"", 0, self.pack_code_lengths({}), self.pack_code_lengths({})
+        
+        binary = isinstance(data, bytes)
+        literal_frequency = Counter()
+        distance_frequency = Counter()
+        tokens = []
+        
+        for token in self.lz77.tokenize(data):
+            if isinstance(token, tuple):
+                match_length, distance = token
+                length_bucket = self.lz77.bucket(match_length - MIN_MATCH)
+                distance_bucket = self.lz77.bucket(distance - 1)
+                literal_frequency[LENGTH_SYMBOL_BASE + length_bucket[0]] += 1
+                distance_frequency[distance_bucket[0]] += 1
+                tokens.append((length_bucket, distance_bucket))
+            else:
+                symbol = token if binary else ord(token)
+                literal_frequency[symbol] += 1
+                tokens.append(symbol)
+        
+        literal_lengths = self.limit_code_lengths(self.code_lengths(self.build_tree_from_frequency(literal_frequency)))
+        distance_lengths = self.limit_code_lengths(self.code_lengths(self.build_tree_from_frequency(distance_frequency)))
+        literal_codes = self.canonical_codes(literal_lengths)
+        distance_codes = self.canonical_codes(distance_lengths)
+        
+        def token_bits(group):
+            pieces = []
+            for token in group:
+                if isinstance(token, int):
+                    pieces.append(literal_codes[token])
+                    continue
+                (length_symbol, length_bits, length_extra), (distance_symbol, distance_bits, distance_extra) = token
+                pieces.append(literal_codes[LENGTH_SYMBOL_BASE + length_symbol])
+                if length_bits:
+                    pieces.append(format(length_extra, f'0{length_bits}b'))
+                pieces.append(distance_codes[distance_symbol])
+                if distance_bits:
+                    pieces.append(format(distance_extra, f'0{distance_bits}b'))
+            return ''.join(pieces)
+        
+        encoded_bytes, padding = self.pack_bit_strings(
+            token_bits(tokens[start:start + 16384]) for start in range(0, len(tokens), 16384)
+        )
+        return (encoded_bytes, padding,
+                self.pack_code_lengths(literal_lengths), self.pack_code_lengths(distance_lengths))
+    
+    def decompress_lz77_data(self, encoded_bytes, literal_lengths, distance_lengths, size, binary):
+        """Leer literales y pares (longitud, distancia) hasta recuperar size símbolos"""
+        output = bytearray() if binary else []
+        if size == 0:
+            return bytes(output) if binary else ""
+        
+        literal_table, literal_bits = self.build_decode_table(
+            self.canonical_codes(self.unpack_code_lengths(literal_lengths)))
+        distance_codes = self.canonical_codes(self.unpack_code_lengths(distance_lengths))
+        distance_table, distance_bits = self.build_decode_table(distance_codes) if distance_codes else (None, 0)
+        literal_mask = (1 << literal_bits) - 1
+        distance_mask = (1 << distance_bits) - 1
+        data = encoded_bytes
+        buffer = 0
+        available = 0
+        position = 0
+        
+        def fill(needed):
+            nonlocal buffer, available, position
+            while available < needed:
+                # Más allá del final se leen ceros (relleno)
+                buffer = (buffer << 8) | (data[position] if position < len(data) else 0)
+                position += 1
+                available += 8
+        
+        def read_bits(count):
+            nonlocal available
+            fill(count)
+            available -= count
+            return (buffer >> available) & ((1 << count) - 1)
+        
+        while len(output) < size:
+            fill(literal_bits)
+            symbol, code_length = literal_table[(buffer >> (available - literal_bits)) & literal_mask]
+            available -= code_length
+            if symbol < LENGTH_SYMBOL_BASE:
+                output.append(symbol if binary else chr(symbol))
+            else:
+                base, extra_bits = self.lz77.bucket_base(symbol - LENGTH_SYMBOL_BASE)
+                match_length = base + read_bits(extra_bits) + MIN_MATCH
+                fill(distance_bits)
+                distance_symbol, code_length = distance_table[(buffer >> (available - distance_bits)) & distance_mask]
+                available -= code_length
+                base, extra_bits = self.lz77.bucket_base(distance_symbol)
+                distance = base + read_bits(extra_bits) + 1
+                
+                start = len(output) - distance
+                if distance >= match_length:
+                    output.extend(output[start:start + match_length])
+                else:
+                    # Coincidencia solapada: se copia símbolo a símbolo
+                    for offset in range(match_length):
+                        output.append(output[start + offset])
+            buffer &= (1 << available) - 1
+        
+        return bytes(output) if binary else ''.join(output)
+    
+    def dictionary_path(self, dictionary_id):
+        return os.path.join(self.dictionary_dir, f"{dictionary_id}.dict")
+    
+    def train_dictionary(self, sample_files, binary=False):
+        """Entrenar un modelo de Huffman compartido con archivos de muestra y guardarlo; devuelve su ID"""
+        frequency = Counter()
+        for sample_file in sample_files:
+            with self.open_source(sample_file, binary) as file:
+                while True:
+                    data = file.read(DEFAULT_BLOCK_SIZE)
+                    if not data:
+                        break
+                    frequency.update(data if binary else map(ord, data))
+        
+        if binary:
+            # Todos los bytes reciben código: no hace falta escape
+            frequency.update(range(256))
+        else:
+            frequency[ESCAPE_SYMBOL] += 1
+        
+        lengths = self.limit_code_lengths(self.code_lengths(self.build_tree_from_frequency(frequency)))
+        dictionary = {
+            'symbol_type': 'bytes' if binary else 'text',
+            'code_lengths': self.pack_code_lengths(lengths)
+        }
+        # El ID depende solo del contenido: entrenar dos veces con lo mismo da el mismo diccionario
+        dictionary['id'] = hashlib.sha1(pickle.dumps(dictionary)).hexdigest()[:16]
+        
+        os.makedirs(self.dictionary_dir, exist_ok=True)
+        with open(self.dictionary_path(dictionary['id']), 'wb') as file:
+            pickle.dump(dictionary, file)
+        
+        return dictionary['id']
+    
+    def load_dictionary(self, dictionary_id):
+        """Cargar un diccionario por ID, con caché LRU de los ya preparados"""
+        if dictionary_id in self.dictionary_cache:
+            self.dictionary_cache.move_to_end(dictionary_id)
+            return self.dictionary_cache[dictionary_id]
+        
+        path = self.dictionary_path(dictionary_id)
+        if not os.path.exists(path):
+            raise Exception(f"Diccionario no encontrado: {dictionary_id}")
+        with open(path, 'rb') as file:
+            dictionary = pickle.load(file)
+        
+        codes = self.canonical_codes(self.unpack_code_lengths(dictionary['code_lengths']))
+        model = {'symbol_type': dictionary['symbol_type']}
+        if dictionary['symbol_type'] == 'bytes':
+            model['code_table'] = np.array([int(codes[symbol], 2) for symbol in range(256)], dtype=np.uint32)
+            model['length_table'] = np.array([len(codes[symbol]) for symbol in range(256)], dtype=np.uint8)
+        else:
+            # Claves como caracteres para codificar y decodificar sin convertir; None es el escape
+            codes = {None if symbol == ESCAPE_SYMBOL else chr(symbol): code for symbol, code in codes.items()}
+        model['codes'] = codes
+        model['table'], model['table_bits'] = self.build_decode_table(codes)
         
-        return encoded_text, codes
+        self.dictionary_cache[dictionary_id] = model
+        if len(self.dictionary_cache) > DICTIONARY_CACHE_SIZE:
+            self.dictionary_cache.popitem(last=False)
+        return model
     
-    def decompress_text(self, encoded_text, codes):
-        reverse_codes = {v: k for k, v in codes.items()}
-        current_code = ""
-        decoded_text = ""
+    def compress_with_dictionary(self, data, dictionary_id):
+        """Codificar con un diccionario compartido; devuelve (bytes, relleno, caracteres escapados)"""
+        model = self.load_dictionary(dictionary_id)
+        if (model['symbol_type'] == 'bytes') != isinstance(data, bytes):
+            raise Exception("El diccionario no corresponde al tipo de archivo (texto/binario)")
         
-        for bit in encoded_text:
-            current_code += bit
-            if current_code in reverse_codes:
-                decoded_text += reverse_codes[current_code]
-                current_code = ""
+        if isinstance(data, bytes):
+            values = np.frombuffer(data, dtype=np.uint8)
+            encoded_bytes, padding = self.pack_bits_vectorized(values, model['code_table'], model['length_table'])
+            return encoded_bytes, padding, ""
         
-        return decoded_text
+        codes = model['codes']
+        escape_code = codes[None]
+        encoded_bytes, padding = self.pack_bit_strings(
+            ''.join(codes.get(char, escape_code) for char in data[start:start + 65536])
+            for start in range(0, len(data), 65536)
+        )
+        # Los caracteres no vistos al entrenar se guardan aparte, en orden
+        escaped = ''.join(char for char in data if char not in codes)
+        return encoded_bytes, padding, escaped
     
-    def compress(self, input_file):
-        with open(input_file, 'r', encoding='utf-8') as file:
+    def decompress_with_dictionary(self, encoded_bytes, padding, dictionary_id, escaped):
+        model = self.load_dictionary(dictionary_id)
+        binary = model['symbol_type'] == 'bytes'
+        if not encoded_bytes:
+            return b"" if binary else ""
+        
+        symbols = self.decode_with_table(encoded_bytes, padding, model['table'], model['table_bits'])
+        if binary:
+            return bytes(symbols)
+        if escaped:
+            replacements = iter(escaped)
+            symbols = [next(replacements) if symbol is None else symbol for symbol in symbols]
+        return ''.join(symbols)
+    
+    def encode_block(self, text, coder='huffman', dictionary=None):
+        """Codificar un bloque con 'huffman', 'words' (Huffman por palabras), 'rans' o 'lz77'
+        
+        Con dictionary se usa el modelo de Huffman compartido con ese ID y el bloque
+        guarda solo el ID en lugar de la tabla de códigos.
+        """
+        if dictionary is not None:
+            if coder != 'huffman':
+                raise Exception("Los diccionarios compartidos solo se usan con Huffman")
+            encoded_bytes, padding, escaped = self.compress_with_dictionary(text, dictionary)
+            block = {
+                'dictionary': dictionary,
+                'encoded_bytes': encoded_bytes,
+                'padding': padding,
+                'original_size': len(text)
+            }
+            if escaped:
+                block['escaped'] = escaped
+        elif coder == 'lz77':
+            encoded_bytes, padding, literal_lengths, distance_lengths = self.compress_lz77_data(text)
+            block = {
+                'coder': 'lz77',
+                'encoded_bytes': encoded_bytes,
+                'padding': padding,
+                'literal_lengths': literal_lengths,
+                'distance_lengths': distance_lengths,
+                'original_size': len(text)
+            }
+        elif coder == 'words':
+            if isinstance(text, bytes):
+                raise Exception("El modo por palabras solo admite texto")
+            encoded_bytes, padding, code_lengths = self.compress_words(text)
+            # Se decodifica igual que Huffman por caracteres: los símbolos se concatenan
+            block = {
+                'coder': 'words',
+                'encoded_bytes': encoded_bytes,
+                'padding': padding,
+                'code_lengths': code_lengths,
+                'original_size': len(text)
+            }
+        elif coder == 'rans':
+            encoded_bytes, model = self.rans_coder.encode(text)
+            block = {
+                'coder': 'rans',
+                'encoded_bytes': encoded_bytes,
+                'model': model,
+                'original_size': len(text)
+            }
+        elif coder == 'huffman':
+            if isinstance(text, bytes):
+                encoded_bytes, padding, code_lengths = self.compress_bytes_data(text)
+            else:
+                encoded_bytes, padding, code_lengths = self.compress_text(text)
+            block = {
+                'encoded_bytes': encoded_bytes,
+                'padding': padding,
+                'code_lengths': code_lengths,
+                'original_size': len(text)
+            }
+        else:
+            raise Exception(f"Codificador no soportado: {coder}")
+        
+        if isinstance(text, bytes):
+            block['symbol_type'] = 'bytes'
+        return block
+    
+    def decode_block(self, block):
+        if 'encoded_text' in block:
+            # Archivos .bin anteriores al empaquetado en bytes: {'encoded_text', 'codes'}
+            return self.decompress_legacy(block['encoded_text'], block['codes'])
+        if 'dictionary' in block:
+            return self.decompress_with_dictionary(block['encoded_bytes'], block['padding'],
+                                                   block['dictionary'], block.get('escaped', ""))
+        if block.get('coder') == 'lz77':
+            return self.decompress_lz77_data(block['encoded_bytes'], block['literal_lengths'],
+                                             block['distance_lengths'], block['original_size'],
+                                             block.get('symbol_type') == 'bytes')
+        if block.get('coder') == 'rans':
+            return self.rans_coder.decode(block['encoded_bytes'], block['model'], block['original_size'])
+        if block.get('symbol_type') == 'bytes':
+            return self.decompress_bytes_data(block['encoded_bytes'], block['padding'], block['code_lengths'])
+        return self.decompress_text(block['encoded_bytes'], block['padding'], block['code_lengths'])
+    
+    def encode_block_frame(self, text, coder='huffman', dictionary=None):
+        """Codificar un bloque y serializarlo (se ejecuta también en los procesos del pool)"""
+        return self.dump_block(self.encode_block(text, coder, dictionary))
+    
+    def dump_block(self, block):
+        """Serializar un bloque: los de diccionario con el formato compacto, el resto con pickle"""
+        if 'dictionary' not in block:
+            return pickle.dumps(block)
+        
+        try:
+            dictionary_id = bytes.fromhex(block['dictionary'])
+        except ValueError:
+            dictionary_id = b""
+        if len(dictionary_id) != 8:
+            raise Exception(f"ID de diccionario no válido: {block['dictionary']}")
+        escaped = block.get('escaped', "").encode('utf-8')
+        extension = block.get('original_ext', "").encode('utf-8')
+        flags = block['padding'] | (block.get('symbol_type') == 'bytes') << 3
+        return b"".join([
+            struct.pack(DICTIONARY_BLOCK_FORMAT, DICTIONARY_BLOCK_MAGIC, flags, dictionary_id),
+            self.encode_varint(block['original_size']), self.encode_varint(len(block['encoded_bytes'])),
+            self.encode_varint(len(escaped)), self.encode_varint(len(extension)),
+            block['encoded_bytes'], escaped, extension
+        ])
+    
+    def load_object(self, file):
+        """Leer el siguiente bloque, cabecera o índice de file, sea pickle o bloque compacto"""
+        if file.peek(1)[:1] != DICTIONARY_BLOCK_MAGIC:
+            return pickle.load(file)
+        
+        _, flags, dictionary_id = struct.unpack(DICTIONARY_BLOCK_FORMAT,
+                                                file.read(struct.calcsize(DICTIONARY_BLOCK_FORMAT)))
+        original_size, encoded_size, escaped_size, extension_size = (self.read_varint(file) for _ in range(4))
+        block = {
+            'dictionary': dictionary_id.hex(),
+            'encoded_bytes': file.read(encoded_size),
+            'padding': flags & 0x07,
+            'original_size': original_size
+        }
+        escaped = file.read(escaped_size).decode('utf-8')
+        if escaped:
+            block['escaped'] = escaped
+        if flags & 0x08:
+            block['symbol_type'] = 'bytes'
+            block['original_ext'] = file.read(extension_size).decode('utf-8')
+        return block
+    
+    def encode_varint(self, value):
+        """Entero no negativo como varint LEB128 (7 bits por byte, bit alto = continúa)"""
+        output = bytearray()
+        while value >= 0x80:
+            output.append(value & 0x7F | 0x80)
+            value >>= 7
+        output.append(value)
+        return bytes(output)
+    
+    def read_varint(self, file):
+        value = 0
+        shift = 0
+        while True:
+            byte = file.read(1)
+            if not byte:
+                raise Exception("Bloque con diccionario truncado")
+            value |= (byte[0] & 0x7F) << shift
+            shift += 7
+            if byte[0] < 0x80:
+                return value
+    
+    def decode_block_at(self, input_file, offset):
+        """Leer y decodificar el bloque que empieza en offset (usado por el pool)"""
+        with open(input_file, 'rb') as file:
+            return self.load_block(file, offset)
+    
+    def load_block(self, file, offset):
+        file.seek(offset)
+        return self.decode_block(self.load_object(file))
+    
+    def new_index(self):
+        return {'block_offsets': [], 'frame_sizes': [], 'original_offsets': [], 'original_sizes': [],
+                'line_counts': []}
+    
+    def block_stats(self, text):
+        """Tamaño original y número de saltos de línea de un bloque"""
+        return len(text), text.count(b'\n' if isinstance(text, bytes) else '\n')
+    
+    def write_block(self, file, frame, stats, index):
+        original_size, line_count = stats
+        sizes = index['original_sizes']
+        index['block_offsets'].append(file.tell())
+        index['frame_sizes'].append(len(frame))
+        index['original_offsets'].append(index['original_offsets'][-1] + sizes[-1] if sizes else 0)
+        index['original_sizes'].append(original_size)
+        index['line_counts'].append(line_count)
+        file.write(frame)
+    
+    def write_index(self, file, index):
+        """Escribir la tabla de bloques y, al final, su posición en 8 bytes"""
+        index_offset = file.tell()
+        pickle.dump(index, file)
+        file.write(struct.pack('<Q', index_offset))
+    
+    def read_index(self, file):
+        file.seek(-8, os.SEEK_END)
+        index_offset, = struct.unpack('<Q', file.read(8))
+        file.seek(index_offset)
+        return pickle.load(file)
+    
+    def iter_blocks(self, file):
+        """Leer uno a uno los bloques que siguen a la cabecera de un archivo por bloques"""
+        while True:
+            block = self.load_object(file)
+            # La tabla de bloques marca el final de los datos
+            if 'block_offsets' in block:
+                break
+            yield block
+    
+    def open_source(self, input_file, binary):
+        if binary:
+            return open(input_file, 'rb')
+        return open(input_file, 'r', encoding='utf-8')
+    
+    def block_header(self, input_file, block_size, binary):
+        header = {'format': 'blocks', 'block_size': block_size}
+        if binary:
+            header['symbol_type'] = 'bytes'
+            header['original_ext'] = os.path.splitext(input_file)[1]
+        return header
+    
+    def open_decompressed(self, input_file, header):
+        """Abrir el archivo de salida en modo texto o binario según la cabecera"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.splitext(os.path.basename(input_file))[0]
+        if header.get('symbol_type') == 'bytes':
+            extension = header.get('original_ext') or '.dat'
+            output_file = os.path.join(self.output_dir, f"{filename}_decompressed_{timestamp}{extension}")
+            return open(output_file, 'wb')
+        output_file = os.path.join(self.output_dir, f"{filename}_decompressed_{timestamp}.txt")
+        return open(output_file, 'w', encoding='utf-8')
+    
+    def compress(self, input_file, binary=False, coder='huffman', dictionary=None):
+        """Comprimir un archivo de texto, o cualquier archivo byte a byte si binary=True"""
+        if os.path.getsize(input_file) > STREAM_THRESHOLD:
+            return self.compress_stream(input_file, binary=binary, coder=coder, dictionary=dictionary)
+        
+        with self.open_source(input_file, binary) as file:
             text = file.read()
         
-        encoded_text, codes = self.compress_text(text)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.splitext(os.path.basename(input_file))[0]
+        output_file = os.path.join(self.output_dir, f"{filename}_compressed_{timestamp}.bin")
+        
+        compressed_data = self.encode_block(text, coder, dictionary)
+        if binary:
+            compressed_data['original_ext'] = os.path.splitext(input_file)[1]
+        
+        with open(output_file, 'wb') as file:
+            file.write(self.dump_block(compressed_data))
         
+        return output_file
+    
+    def compress_stream(self, input_file, block_size=DEFAULT_BLOCK_SIZE, binary=False, coder='huffman',
+                        dictionary=None):
+        """Comprimir por bloques de tamaño fijo, cada uno con su propia tabla de Huffman"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.splitext(os.path.basename(input_file))[0]
+        output_file = os.path.join(self.output_dir, f"{filename}_compressed_{timestamp}.bin")
+        index = self.new_index()
+        
+        with self.open_source(input_file, binary) as source, open(output_file, 'wb') as file:
+            pickle.dump(self.block_header(input_file, block_size, binary), file)
+            while True:
+                text = source.read(block_size)
+                if not text:
+                    break
+                self.write_block(file, self.encode_block_frame(text, coder, dictionary), self.block_stats(text), index)
+            self.write_index(file, index)
+        
+        return output_file
+    
+    def compress_parallel(self, input_file, block_size=DEFAULT_BLOCK_SIZE, workers=None, binary=False,
+                          coder='huffman', dictionary=None):
+        """Comprimir por bloques codificándolos en un pool de procesos"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = os.path.splitext(os.path.basename(input_file))[0]
         output_file = os.path.join(self.output_dir, f"{filename}_compressed_{timestamp}.bin")
+        workers = workers or os.cpu_count() or 1
+        index = self.new_index()
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor, \
+                self.open_source(input_file, binary) as source, \
+                open(output_file, 'wb') as file:
+            pickle.dump(self.block_header(input_file, block_size, binary), file)
+            # Se limita el número de bloques en vuelo para no leer todo el archivo a memoria
+            pending = deque()
+            while True:
+                text = source.read(block_size)
+                if not text:
+                    break
+                pending.append((executor.submit(self.encode_block_frame, text, coder, dictionary), self.block_stats(text)))
+                if len(pending) >= 2 * workers:
+                    future, stats = pending.popleft()
+                    self.write_block(file, future.result(), stats, index)
+            while pending:
+                future, stats = pending.popleft()
+                self.write_block(file, future.result(), stats, index)
+            self.write_index(file, index)
+        
+        return output_file
+    
+    def reusable_blocks(self, previous_file, binary):
+        """Bloques de una compresión incremental anterior: huella -> (offset, tamaño, estadísticas)"""
+        if not previous_file or not os.path.exists(previous_file):
+            return {}
         
-        compressed_data = {
-            'encoded_text': encoded_text,
-            'codes': codes,
-            'original_size': len(text)
+        with open(previous_file, 'rb') as file:
+            header = self.load_object(file)
+            if header.get('format') != 'blocks' or (header.get('symbol_type') == 'bytes') != binary:
+                return {}
+            index = self.read_index(file)
+        
+        if 'digests' not in index:
+            return {}
+        return {
+            digest: (offset, frame_size, (original_size, line_count))
+            for digest, offset, frame_size, original_size, line_count in zip(
+                index['digests'], index['block_offsets'], index['frame_sizes'],
+                index['original_sizes'], index['line_counts'])
         }
+    
+    def compress_incremental(self, input_file, previous_file=None, binary=False, coder='huffman', dictionary=None):
+        """Comprimir por bloques definidos por el contenido, copiando de previous_file los que no cambian
         
-        with open(output_file, 'wb') as file:
-            pickle.dump(compressed_data, file)
+        Solo se vuelven a codificar los bloques cuya huella SHA-1 no está en el archivo
+        anterior; el resto se copia tal cual, ya comprimido.
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = os.path.splitext(os.path.basename(input_file))[0]
+        output_file = os.path.join(self.output_dir, f"{filename}_compressed_{timestamp}.bin")
+        reusable = self.reusable_blocks(previous_file, binary)
+        index = self.new_index()
+        index['digests'] = []
+        index['reused_blocks'] = 0
+        
+        # Se escribe en un temporal: en el mismo segundo output_file puede ser previous_file,
+        # del que aún hay que copiar los bloques reutilizados
+        temporary_file = output_file + ".tmp"
+        try:
+            with open(input_file, 'rb') as source, open(temporary_file, 'wb') as file, \
+                    open(previous_file if reusable else os.devnull, 'rb') as previous:
+                header = self.block_header(input_file, CDC_MAX_SIZE, binary)
+                header['chunking'] = 'content'
+                pickle.dump(header, file)
+                
+                for raw in ContentDefinedChunker().iter_chunks(source, text=not binary):
+                    digest = hashlib.sha1(raw).digest()
+                    if digest in reusable:
+                        offset, frame_size, stats = reusable[digest]
+                        previous.seek(offset)
+                        frame = previous.read(frame_size)
+                        index['reused_blocks'] += 1
+                    else:
+                        # Mismo tratamiento de saltos de línea que al leer en modo texto
+                        data = raw if binary else raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+                        frame = self.encode_block_frame(data, coder, dictionary)
+                        stats = self.block_stats(data)
+                    self.write_block(file, frame, stats, index)
+                    index['digests'].append(digest)
+                self.write_index(file, index)
+        except BaseException:
+            if os.path.exists(temporary_file):
+                os.remove(temporary_file)
+            raise
+        os.replace(temporary_file, output_file)
         
         return output_file
     
     def decompress(self, input_file):
         with open(input_file, 'rb') as file:
-            compressed_data = pickle.load(file)
+            compressed_data = self.load_object(file)
+            with self.open_decompressed(input_file, compressed_data) as output:
+                if compressed_data.get('format') == 'blocks':
+                    # Cada bloque se decodifica y se escribe antes de leer el siguiente
+                    for block in self.iter_blocks(file):
+                        output.write(self.decode_block(block))
+                else:
+                    output.write(self.decode_block(compressed_data))
         
-        encoded_text = compressed_data['encoded_text']
-        codes = compressed_data['codes']
-        decoded_text = self.decompress_text(encoded_text, codes)
+        return output.name
+    
+    def decompress_parallel(self, input_file, workers=None):
+        """Descomprimir un archivo por bloques decodificando en paralelo desde la tabla de bloques"""
+        with open(input_file, 'rb') as file:
+            header = self.load_object(file)
+            if header.get('format') != 'blocks':
+                return self.decompress(input_file)
+            index = self.read_index(file)
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = os.path.join(self.output_dir, f"{filename}_decompressed_{timestamp}.txt")
+        workers = workers or os.cpu_count() or 1
         
-        with open(output_file, 'w', encoding='utf-8') as file:
-            file.write(decoded_text)
+        with ProcessPoolExecutor(max_workers=workers) as executor, \
+                self.open_decompressed(input_file, header) as output:
+            pending = deque()
+            for offset in index['block_offsets']:
+                pending.append(executor.submit(self.decode_block_at, input_file, offset))
+                if len(pending) >= 2 * workers:
+                    output.write(pending.popleft().result())
+            while pending:
+                output.write(pending.popleft().result())
         
-        return output_file
\ No newline at end of file
+        return output.name
+    
+    def check_range(self, start, end):
+        """Rechazar rangos negativos o invertidos en vez de tratarlos como índices de Python"""
+        if start < 0 or end < start:
+            raise Exception(f"Rango no válido: [{start}, {end})")
+    
+    def read_range(self, input_file, start, end):
+        """Devolver los símbolos [start, end) decodificando solo los bloques necesarios
+        
+        Las posiciones son caracteres en modo texto y bytes en modo binario.
+        """
+        self.check_range(start, end)
+        with open(input_file, 'rb') as file:
+            header = self.load_object(file)
+            if header.get('format') != 'blocks':
+                return self.decode_block(header)[start:end]
+            
+            index = self.read_index(file)
+            offsets = index['original_offsets']
+            empty = b"" if header.get('symbol_type') == 'bytes' else ""
+            if not offsets or start >= end:
+                return empty
+            
+            first = max(bisect_right(offsets, start) - 1, 0)
+            last = max(bisect_right(offsets, end - 1) - 1, first)
+            parts = [self.load_block(file, index['block_offsets'][i]) for i in range(first, last + 1)]
+        
+        data = empty.join(parts)
+        base = offsets[first]
+        return data[max(start - base, 0):end - base]
+    
+    def read_lines(self, input_file, first, last):
+        """Devolver las líneas [first, last) (contando desde 0) sin el salto de línea final"""
+        self.check_range(first, last)
+        with open(input_file, 'rb') as file:
+            header = self.load_object(file)
+            newline = b"\n" if header.get('symbol_type') == 'bytes' else "\n"
+            if header.get('format') != 'blocks':
+                return self.select_lines(self.decode_block(header), newline, first, last, True)
+            
+            index = self.read_index(file)
+            if not index['block_offsets'] or first >= last:
+                return []
+            
+            # Saltos de línea acumulados hasta el final de cada bloque
+            line_ends = []
+            total = 0
+            for count in index['line_counts']:
+                total += count
+                line_ends.append(total)
+            
+            # La línea n empieza tras el salto n-1 y termina en el salto n
+            start_block = bisect_right(line_ends, first - 1) if first > 0 else 0
+            end_block = min(bisect_right(line_ends, last - 1), len(line_ends) - 1)
+            if start_block >= len(line_ends):
+                return []
+            lines_before = line_ends[start_block - 1] if start_block > 0 else 0
+            parts = [self.load_block(file, index['block_offsets'][i]) for i in range(start_block, end_block + 1)]
+        
+        at_end = end_block == len(line_ends) - 1
+        return self.select_lines(newline[:0].join(parts), newline, first - lines_before, last - lines_before, at_end)
+    
+    def select_lines(self, data, newline, first, last, at_end):
+        lines = data.split(newline)
+        # Un salto final no abre una línea nueva al final del archivo
+        if at_end and (not data or data.endswith(newline)):
+            lines.pop()
+        return lines[first:last]
\ No newline at end of file
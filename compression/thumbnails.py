@@ -0,0 +1,109 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+THUMBNAIL_SIZE = (250, 180)
+THUMBNAIL_CACHE_SIZE = 64
+THUMBNAIL_DISK_ENTRIES = 512
+
+class ThumbnailService:
+    """Miniaturas de imágenes generadas en un hilo aparte, con caché LRU en memoria y en disco
+    
+    La clave de caché es la ruta absoluta, la fecha de modificación y el tamaño del archivo,
+    así que un archivo modificado genera una miniatura nueva. En disco se guardan como
+    mucho disk_entries miniaturas; al pasarse se borran las de fecha de modificación más
+    antigua, que se actualiza en cada acierto.
+    """
+    
+    def __init__(self, cache_dir, size=THUMBNAIL_SIZE, cache_size=THUMBNAIL_CACHE_SIZE,
+                 disk_entries=THUMBNAIL_DISK_ENTRIES):
+        self.cache_dir = cache_dir
+        self.size = size
+        self.cache_size = cache_size
+        self.disk_entries = disk_entries
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    def cache_key(self, path):
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{self.size[0]}x{self.size[1]}"
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+    
+    def render(self, path):
+        """Decodificar a resolución reducida: draft en JPEG y reduce() en el resto de formatos"""
+        img = Image.open(path)
+        # En JPEG el decodificador escala por 1/2, 1/4 o 1/8 sin decodificar la imagen entera
+        img.draft('RGB' if img.mode == 'CMYK' else img.mode, self.size)
+        if img.mode not in ('L', 'LA', 'RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode.endswith('A') else 'RGB')
+        
+        # Reducir por un factor entero dejando el doble del tamaño final para el filtrado de thumbnail
+        factor = min(img.width // (2 * self.size[0]), img.height // (2 * self.size[1]))
+        if factor > 1:
+            img = img.reduce(factor)
+        img.thumbnail(self.size)
+        return img
+    
+    def get(self, path):
+        """Devolver la miniatura de path desde la caché en memoria, la de disco o generándola"""
+        key = self.cache_key(path)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+        
+        cache_file = os.path.join(self.cache_dir, f"{key}.png")
+        if os.path.exists(cache_file):
+            thumbnail = Image.open(cache_file)
+            thumbnail.load()
+            os.utime(cache_file)
+        else:
+            thumbnail = self.render(path)
+            thumbnail.save(cache_file)
+            self.prune_disk_cache()
+        
+        with self.lock:
+            self.cache[key] = thumbnail
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return thumbnail
+    
+    def prune_disk_cache(self):
+        """Borrar las miniaturas de disco más antiguas hasta dejar disk_entries"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.png'):
+                try:
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+                except OSError:
+                    pass
+        if len(entries) <= self.disk_entries:
+            return
+        
+        entries.sort()
+        for _, cache_file in entries[:len(entries) - self.disk_entries]:
+            try:
+                os.remove(cache_file)
+            except OSError:
+                pass
+    
+    def request(self, path, callback):
+        """Generar la miniatura en el hilo del servicio y llamar a callback(miniatura, error)
+        
+        callback se ejecuta en ese hilo: en Tk hay que reenviarlo con after() antes de
+        tocar ningún widget.
+        """
+        def work():
+            try:
+                thumbnail = self.get(path)
+            except Exception as e:
+                callback(None, e)
+            else:
+                callback(thumbnail, None)
+        
+        return self.executor.submit(work)
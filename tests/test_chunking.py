@@ -0,0 +1,127 @@
+import io
+import pickle
+import random
+
+import pytest
+
+from compression import chunking, text_compression
+from compression.chunking import ContentDefinedChunker
+
+def random_bytes(size, seed=0):
+    return random.Random(seed).randbytes(size)
+
+def small_chunker():
+    return ContentDefinedChunker(min_size=256, mask_bits=8, max_size=2048)
+
+def chunks(chunker, data, text=False):
+    return list(chunker.iter_chunks(io.BytesIO(data), text=text))
+
+@pytest.fixture(params=[64 * 1024, 1000, 97], ids=lambda size: f"read{size}")
+def read_size(request, monkeypatch):
+    # Lecturas pequeñas para que las fronteras caigan entre lecturas
+    monkeypatch.setattr(chunking, "READ_SIZE", request.param)
+    return request.param
+
+@pytest.mark.parametrize("data", [b"", b"x", b"\x00" * 10000, random_bytes(50000)])
+def test_chunks_cover_input(read_size, data):
+    parts = chunks(small_chunker(), data)
+    assert b"".join(parts) == data
+    assert all(len(part) <= 2048 for part in parts)
+    assert all(len(part) >= 256 for part in parts[:-1])
+
+def test_boundaries_survive_an_edit(read_size):
+    data = random_bytes(60000, 1)
+    edited = data[:30000] + b"insertado" + data[30000:]
+    before = chunks(small_chunker(), data)
+    after = chunks(small_chunker(), edited)
+    assert b"".join(after) == edited
+    # Solo cambian los bloques alrededor de la edición
+    assert len(set(before) & set(after)) >= len(before) - 3
+
+def test_text_chunks_end_on_lines(read_size):
+    generator = random.Random(2)
+    lines = ["ñandú " * generator.randint(0, 40) + str(i) for i in range(3000)]
+    data = ("\n".join(lines) + "\n").encode('utf-8')
+    parts = chunks(small_chunker(), data, text=True)
+    assert b"".join(parts) == data
+    for part in parts:
+        part.decode('utf-8')
+    # Los que no acaban en salto de línea son cortes forzados, retrocedidos como mucho 3 bytes
+    assert all(part.endswith(b"\n") or len(part) > 2048 - 4 for part in parts)
+
+def test_forced_cut_keeps_utf8_characters(read_size):
+    # Sin saltos de línea los cortes forzados no pueden partir un carácter
+    data = ("€" * 5000).encode('utf-8')
+    parts = chunks(small_chunker(), data, text=True)
+    assert b"".join(parts) == data
+    for part in parts:
+        part.decode('utf-8')
+
+def crlf_text(line_count, seed):
+    generator = random.Random(seed)
+    words = ["compresión", "bloque", "línea", "datos", "texto", "índice"]
+    return "".join(" ".join(generator.choice(words) for _ in range(generator.randint(1, 15))) + "\r\n"
+                   for _ in range(line_count))
+
+def write_text(path, text):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        file.write(text)
+    with open(path, 'r', encoding='utf-8') as file:
+        return file.read()
+
+def compress_incremental(compressor, path, previous=None):
+    output_file = compressor.compress_incremental(str(path), previous)
+    with open(output_file, 'rb') as file:
+        pickle.load(file)
+        index = compressor.read_index(file)
+    return output_file, index
+
+def check_round_trip(compressor, output_file, expected):
+    with open(compressor.decompress(output_file), 'r', encoding='utf-8', newline='') as file:
+        assert file.read() == expected
+    lines = expected.split("\n")[:-1]
+    assert compressor.read_range(output_file, 100, 2500) == expected[100:2500]
+    assert compressor.read_lines(output_file, 20, 60) == lines[20:60]
+
+@pytest.mark.parametrize("mask_bits", [8, 40], ids=["content", "forced"])
+def test_incremental_crlf_round_trip(tmp_path, monkeypatch, mask_bits):
+    # Con mask_bits=40 no hay fronteras por contenido y todos los cortes son forzados
+    monkeypatch.setattr(text_compression, "ContentDefinedChunker",
+                        lambda: ContentDefinedChunker(min_size=64, mask_bits=mask_bits, max_size=1000))
+    compressor = text_compression.TextCompressor(str(tmp_path / "out"))
+    path = tmp_path / "texto.txt"
+    
+    original = crlf_text(600, 3)
+    expected = write_text(path, original)
+    first, index = compress_incremental(compressor, path)
+    assert index['reused_blocks'] == 0
+    check_round_trip(compressor, first, expected)
+    
+    # Al añadir al final solo cambia el último bloque del archivo anterior
+    previous_blocks = len(index['block_offsets'])
+    expected = write_text(path, original + crlf_text(50, 4))
+    appended, index = compress_incremental(compressor, path, first)
+    check_round_trip(compressor, appended, expected)
+    assert index['reused_blocks'] >= previous_blocks - 1
+    
+    previous_blocks = len(index['block_offsets'])
+    middle = len(original) // 2
+    expected = write_text(path, original[:middle] + "editado\r\n" + original[middle:] + crlf_text(50, 4))
+    edited, index = compress_incremental(compressor, path, appended)
+    check_round_trip(compressor, edited, expected)
+    if mask_bits == 8:
+        assert index['reused_blocks'] >= previous_blocks - 3
+    else:
+        # Los cortes forzados se desplazan tras la edición: solo se reutiliza lo anterior a ella
+        assert index['reused_blocks'] >= middle // 1000 - 1
+
+def test_incremental_keeps_crlf_across_forced_cut(tmp_path, monkeypatch):
+    monkeypatch.setattr(text_compression, "ContentDefinedChunker",
+                        lambda: ContentDefinedChunker(min_size=64, mask_bits=40, max_size=1000))
+    compressor = text_compression.TextCompressor(str(tmp_path / "out"))
+    path = tmp_path / "texto.txt"
+    # El corte forzado en el byte 1000 cae entre el \r y el \n de la décima línea
+    expected = write_text(path, "y" + ("x" * 98 + "\r\n") * 30)
+    output_file, _ = compress_incremental(compressor, path)
+    with open(compressor.decompress(output_file), 'r', encoding='utf-8', newline='') as file:
+        assert file.read() == expected
@@ -0,0 +1,63 @@
+import json
+import os
+import pickle
+
+import pytest
+
+from compression.text_compression import TextCompressor
+
+@pytest.fixture
+def compressor(tmp_path):
+    return TextCompressor(str(tmp_path / "out"))
+
+def write(path, data):
+    with open(path, 'wb') as file:
+        file.write(data)
+    return str(path)
+
+def train_json(compressor, tmp_path):
+    samples = [write(tmp_path / f"muestra{i}.json", (json.dumps({'id': i, 'name': f"usuario{i}"}) + "\n").encode())
+               for i in range(20)]
+    return compressor.train_dictionary(samples)
+
+def test_small_record_stays_small(compressor, tmp_path):
+    dictionary_id = train_json(compressor, tmp_path)
+    record = b'{"id": 12345, "name": "usuario77"}\n'
+    output_file = compressor.compress(write(tmp_path / "registro.json", record), dictionary=dictionary_id)
+    assert os.path.getsize(output_file) < len(record)
+    with open(compressor.decompress(output_file), 'rb') as file:
+        assert file.read() == record
+
+def test_escaped_characters_round_trip(compressor, tmp_path):
+    dictionary_id = train_json(compressor, tmp_path)
+    text = '{"id": 1, "name": "ñandú €"}\n'
+    output_file = compressor.compress(write(tmp_path / "raro.json", text.encode('utf-8')), dictionary=dictionary_id)
+    assert compressor.read_range(output_file, 0, len(text)) == text
+    assert compressor.read_lines(output_file, 0, 1) == [text[:-1]]
+
+def test_binary_blocks_keep_extension(compressor, tmp_path):
+    data = bytes(range(256)) * 8
+    path = write(tmp_path / "datos.raw", data)
+    dictionary_id = compressor.train_dictionary([path], binary=True)
+    output_file = compressor.compress(path, binary=True, dictionary=dictionary_id)
+    decompressed = compressor.decompress(output_file)
+    assert decompressed.endswith(".raw")
+    with open(decompressed, 'rb') as file:
+        assert file.read() == data
+
+def test_block_files_and_pickled_blocks(compressor, tmp_path):
+    dictionary_id = train_json(compressor, tmp_path)
+    text = "".join(json.dumps({'id': i, 'name': f"usuario{i}"}) + "\n" for i in range(2000))
+    path = write(tmp_path / "registros.json", text.encode())
+    for output_file in (compressor.compress_stream(path, 5000, dictionary=dictionary_id),
+                        compressor.compress_parallel(path, 5000, 2, dictionary=dictionary_id)):
+        assert compressor.read_range(output_file, 12000, 30000) == text[12000:30000]
+    # Los bloques con diccionario guardados antes con pickle se siguen leyendo
+    old_file = tmp_path / "antiguo.bin"
+    with open(old_file, 'wb') as file:
+        pickle.dump(compressor.encode_block(text[:500], dictionary=dictionary_id), file)
+    assert compressor.read_range(str(old_file), 0, 500) == text[:500]
+
+def test_invalid_dictionary_id(compressor):
+    with pytest.raises(Exception):
+        compressor.dump_block({'dictionary': "no-hex", 'encoded_bytes': b"", 'padding': 0, 'original_size': 0})
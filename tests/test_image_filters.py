@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from compression.image_filters import RowFilter, FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_PAETH
+
+SHAPES = [(1, 1), (5, 7), (30, 40, 3), (17, 3, 4), (0, 5), (4, 0, 3)]
+
+def random_array(shape, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, shape, dtype=np.uint8)
+
+def forced_residuals(row_filter, array, filter_types):
+    """Residuos aplicando a cada fila el filtro indicado en vez del elegido por apply"""
+    x = array.astype(np.int16)
+    predictions = row_filter.predictions(*row_filter.neighbours(array))
+    residuals = np.stack([(x - prediction) & 0xFF for prediction in predictions])
+    return residuals[filter_types, np.arange(array.shape[0])].astype(np.uint8)
+
+@pytest.mark.parametrize("shape", SHAPES)
+@pytest.mark.parametrize("filter_count", [FILTER_UP + 1, FILTER_PAETH + 1])
+def test_apply_round_trip(shape, filter_count):
+    row_filter = RowFilter()
+    array = random_array(shape)
+    filter_types, residuals = row_filter.apply(array, filter_count)
+    assert len(filter_types) == shape[0]
+    assert filter_types.max(initial=0) < filter_count
+    assert np.array_equal(row_filter.invert(filter_types, residuals), array)
+
+@pytest.mark.parametrize("shape", [shape for shape in SHAPES if 0 not in shape])
+@pytest.mark.parametrize("filter_type", range(FILTER_PAETH + 1))
+def test_every_filter_inverts(shape, filter_type):
+    # Average y Paeth van por antidiagonales; el resto fila a fila
+    row_filter = RowFilter()
+    array = random_array(shape, filter_type)
+    filter_types = np.full(shape[0], filter_type, dtype=np.uint8)
+    residuals = forced_residuals(row_filter, array, filter_types)
+    assert np.array_equal(row_filter.invert(filter_types, residuals), array)
+
+def test_mixed_filters_invert():
+    row_filter = RowFilter()
+    array = random_array((40, 25, 3), 9)
+    filter_types = np.random.default_rng(9).integers(0, FILTER_PAETH + 1, 40).astype(np.uint8)
+    residuals = forced_residuals(row_filter, array, filter_types)
+    assert np.array_equal(row_filter.invert(filter_types, residuals), array)
+
+def test_gradient_picks_run_friendly_filters():
+    row_filter = RowFilter()
+    # Rampa diagonal: Sub deja la primera fila en una racha y Up deja el resto constantes
+    ys, xs = np.mgrid[0:20, 0:300]
+    ramp = ((xs + 3 * ys + 5) & 0xFF).astype(np.uint8)
+    filter_types, residuals = row_filter.apply(ramp)
+    assert filter_types[0] == FILTER_SUB
+    assert set(filter_types[1:].tolist()) == {FILTER_UP}
+    assert np.count_nonzero(np.diff(residuals, axis=1)) == 1
+    # Filas constantes: sin filtro ya no hay cambios de valor
+    flat = np.repeat(np.arange(20, dtype=np.uint8)[:, None], 300, axis=1)
+    filter_types, _ = row_filter.apply(flat)
+    assert set(filter_types.tolist()) == {FILTER_NONE}
@@ -0,0 +1,56 @@
+import pytest
+
+from compression.lz77 import LZ77, MIN_MATCH
+from compression.text_compression import TextCompressor
+
+def expand(tokens, empty):
+    """Deshacer tokenize copiando símbolo a símbolo, como hace el decodificador"""
+    output = []
+    for token in tokens:
+        if isinstance(token, tuple):
+            length, distance = token
+            for _ in range(length):
+                output.append(output[-distance])
+        else:
+            output.append(token)
+    return bytes(output) if isinstance(empty, bytes) else ''.join(output)
+
+@pytest.mark.parametrize("data", ["", "a", b"", b"\x00", "ab", "abc" * 50, "a" * 1000, b"\xff" * 300,
+                                  "ñandú ñandú ñandú", "abcabcabXabcabcab" * 20])
+def test_tokenize_round_trip(data):
+    assert expand(LZ77().tokenize(data), data[:0]) == data
+
+def test_overlapping_match():
+    # Una racha se codifica como una coincidencia a distancia 1 más larga que la distancia
+    tokens = LZ77().tokenize("a" * 100)
+    assert tokens[0] == "a"
+    assert tokens[1] == (99, 1)
+
+def test_matches_respect_window_and_max_match():
+    lz77 = LZ77(window=16, max_match=20)
+    data = bytes(range(40)) * 3 + b"z" * 100
+    tokens = lz77.tokenize(data)
+    for token in tokens:
+        if isinstance(token, tuple):
+            length, distance = token
+            assert MIN_MATCH <= length <= 20
+            assert distance <= 16
+    assert expand(tokens, b"") == data
+
+@pytest.mark.parametrize("value", list(range(64)) + [255, 256, 1000, 32767, 32768])
+def test_bucket_round_trip(value):
+    lz77 = LZ77()
+    bucket, extra_bits, extra = lz77.bucket(value)
+    base, base_bits = lz77.bucket_base(bucket)
+    assert base_bits == extra_bits
+    assert 0 <= extra < (1 << extra_bits)
+    assert base + extra == value
+
+@pytest.mark.parametrize("data", ["", "a", "a" * 5000, "abcabcabc" * 400, "ñ€𝄞" * 300, b"", b"\x00",
+                                  b"\x01\x02" * 2000, bytes(range(256)) * 20])
+def test_lz77_coder_round_trip(tmp_path, data):
+    compressor = TextCompressor(str(tmp_path))
+    encoded_bytes, padding, literal_lengths, distance_lengths = compressor.compress_lz77_data(data)
+    decoded = compressor.decompress_lz77_data(encoded_bytes, literal_lengths, distance_lengths, len(data),
+                                              isinstance(data, bytes))
+    assert decoded == data
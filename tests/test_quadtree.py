@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from compression.quadtree import Quadtree
+
+def round_trip(quadtree, tile):
+    flags, leaves = quadtree.encode(tile)
+    return quadtree.decode(flags, leaves, tile.shape), flags, leaves
+
+@pytest.mark.parametrize("shape", [(1, 1, 1), (1, 7, 3), (5, 1, 4), (16, 16, 3), (33, 17, 1), (300, 257, 2)])
+def test_random_tiles(shape):
+    tile = np.random.default_rng(sum(shape)).integers(0, 4, shape, dtype=np.uint8)
+    decoded, _, _ = round_trip(Quadtree(), tile)
+    assert np.array_equal(decoded, tile)
+
+def test_uniform_tile_is_one_leaf():
+    tile = np.full((64, 64, 3), 7, dtype=np.uint8)
+    decoded, flags, leaves = round_trip(Quadtree(), tile)
+    assert np.array_equal(decoded, tile)
+    assert flags.tolist() == [True]
+    assert leaves.tolist() == [[7, 7, 7]]
+
+def test_padding_does_not_break_uniform_blocks():
+    # 40x24 se rellena hasta 64x64 repitiendo el borde, así que sigue siendo una hoja
+    tile = np.full((40, 24, 1), 200, dtype=np.uint8)
+    decoded, flags, leaves = round_trip(Quadtree(), tile)
+    assert np.array_equal(decoded, tile)
+    assert len(leaves) == 1
+
+def test_max_level_limits_roots():
+    tile = np.zeros((100, 100, 1), dtype=np.uint8)
+    tile[10:20, 60:90] = 1
+    quadtree = Quadtree(max_level=3)
+    decoded, flags, leaves = round_trip(quadtree, tile)
+    assert np.array_equal(decoded, tile)
+    # Raíces de 8x8: 13x13 bloques, cada uno al menos una hoja
+    assert len(leaves) >= 13 * 13
+
+def test_flat_regions_compress():
+    tile = np.zeros((256, 256, 3), dtype=np.uint8)
+    tile[:128, :128] = 255
+    tile[200:210, 5:250] = (1, 2, 3)
+    _, flags, leaves = round_trip(Quadtree(), tile)
+    assert len(leaves) < 256 * 256 // 50
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from compression.rans import RansCoder
+
+def random_text(length, alphabet, seed=0):
+    generator = random.Random(seed)
+    return ''.join(generator.choice(alphabet) for _ in range(length))
+
+@pytest.mark.parametrize("data", ["", b"", "a", b"\x00", "aaaa", "ab" * 5, "ñandú €𝄞" * 500,
+                                  bytes(range(256)) * 40, "x" * 20000])
+def test_round_trip(data):
+    coder = RansCoder()
+    encoded_bytes, model = coder.encode(data)
+    decoded = coder.decode(encoded_bytes, model, len(data))
+    assert decoded == data
+    assert type(decoded) is type(data)
+
+@pytest.mark.parametrize("length", [1, 7, 63, 64, 65, 1000])
+def test_partial_last_step(length):
+    # Con 64 símbolos por carril hay varios carriles y el último paso no los usa todos
+    coder = RansCoder(lane_symbols=64, max_lanes=8)
+    data = random_text(length, "abcdefgh", length)
+    encoded_bytes, model = coder.encode(data)
+    assert model['lanes'] == min(max(length // 64, 1), 8)
+    assert coder.decode(encoded_bytes, model, length) == data
+
+def test_skewed_and_wide_alphabets():
+    coder = RansCoder(lane_symbols=256)
+    skewed = "a" * 50000 + "b"
+    wide = ''.join(chr(0x4E00 + i) for i in range(3000)) * 3
+    for data in (skewed, wide):
+        encoded_bytes, model = coder.encode(data)
+        assert coder.decode(encoded_bytes, model, len(data)) == data
+    # 3000 símbolos no caben en 12 bits con un mínimo de 1 por símbolo
+    assert coder.encode(wide)[1]['scale_bits'] > 12
+
+def test_compresses_skewed_input():
+    data = random_text(100000, "aaaaaaab", 1)
+    encoded_bytes, _ = RansCoder().encode(data)
+    assert len(encoded_bytes) < len(data) // 4
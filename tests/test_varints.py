@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from compression.image_compression import ImageCompressor, RUN_CODING_BYTE, RUN_CODING_VARINT
+
+@pytest.fixture
+def compressor(tmp_path):
+    return ImageCompressor(str(tmp_path))
+
+@pytest.mark.parametrize("values", [[], [0], [127], [128], [255, 256, 16383, 16384],
+                                    [2 ** 21 - 1, 2 ** 21, 2 ** 35, 2 ** 63 - 1]])
+def test_varint_round_trip(compressor, values):
+    encoded = compressor.encode_varints(values)
+    assert compressor.decode_varints(encoded).tolist() == values
+
+def test_varint_sizes(compressor):
+    # 7 bits por byte: 127 cabe en uno, 128 necesita dos y 2^63 - 1 nueve
+    assert len(compressor.encode_varints([127])) == 1
+    assert len(compressor.encode_varints([128])) == 2
+    assert len(compressor.encode_varints([2 ** 63 - 1])) == 9
+    assert compressor.encode_varints([300]).tolist() == [0xAC, 0x02]
+
+def test_random_varints(compressor):
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 2 ** 40, 10000) >> rng.integers(0, 40, 10000)
+    assert np.array_equal(compressor.decode_varints(compressor.encode_varints(values)), values)
+
+@pytest.mark.parametrize("max_run", [255, None])
+def test_rle_round_trip(compressor, max_run):
+    data = np.concatenate([np.zeros(1000, dtype=np.uint8), np.arange(10, dtype=np.uint8),
+                           np.full(255, 7, np.uint8), np.full(256, 9, np.uint8), [1]]).astype(np.uint8)
+    values, counts = compressor.rle_compress_vectorized(data, max_run=max_run)
+    assert np.array_equal(compressor.rle_decompress_vectorized(values, counts), data)
+    if max_run is None:
+        # El 0 de arange se une a los ceros: 1 + 9 + 1 + 1 + 1 runs
+        assert len(values) == 13
+    else:
+        assert counts.max() <= 255
+
+@pytest.mark.parametrize("run_coding", [RUN_CODING_BYTE, RUN_CODING_VARINT])
+def test_planes_round_trip(compressor, run_coding):
+    rng = np.random.default_rng(2)
+    planes = [np.zeros((0, 4), dtype=np.uint8), np.full((300, 300), 5, dtype=np.uint8),
+              rng.integers(0, 3, (50, 70), dtype=np.uint8)]
+    data = np.frombuffer(compressor.encode_planes(planes, run_coding), dtype=np.uint8)
+    decoded, offset = compressor.decode_planes(data, 0, len(planes), run_coding)
+    assert offset == len(data)
+    for plane, flat in zip(planes, decoded):
+        assert np.array_equal(flat, plane.ravel())